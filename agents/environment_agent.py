@@ -1,11 +1,33 @@
-import time
-import json
-import random
+import numpy as np
 import spade
 from spade.behaviour import CyclicBehaviour
-from spade.message import Message
+from spade.template import Template
+from agents.messaging import (
+    CONTENT_TYPE_ENV_V2,
+    BatchSender,
+    pack_environment,
+    unpack_body,
+)
 from scenarios.base_config import SCENARIO_CONFIG
 
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover - optional dependency
+    def njit(*args, **kwargs):
+        """Fallback no-op decorator used when numba is not installed."""
+        def decorator(func):
+            return func
+        return decorator
+
+
+# Shared by every environment update message. SPADE stores the dict as-is
+# and local delivery passes it through, so it must never be mutated.
+_ENV_UPDATE_METADATA = {
+    "performative": "inform",
+    "type": "environment_update",
+    "content-type": CONTENT_TYPE_ENV_V2,
+}
+
 
 class EnvironmentAgent(spade.agent.Agent):
     """
@@ -22,7 +44,7 @@ class EnvironmentAgent(spade.agent.Agent):
                                  Defaults to SCENARIO_CONFIG.
 
     Attributes:
-        broadcast_list (list[str]): Agents that will receive environment broadcasts.
+        broadcast_list (tuple[str]): Agents that will receive environment broadcasts.
         config (dict): Scenario configuration with environmental settings.
         temperature_c (float): Current temperature in Celsius.
         solar_irradiance (float): Solar irradiance in the range 0.0–1.0.
@@ -31,18 +53,30 @@ class EnvironmentAgent(spade.agent.Agent):
 
     def __init__(self, jid, password, broadcast_list, config=SCENARIO_CONFIG):
         super().__init__(jid, password)
-        self.broadcast_list = broadcast_list
+        self.broadcast_list = tuple(broadcast_list)
         self.config = config
         self.temperature_c = self.config["ENVIRONMENT"]["BASE_TEMPERATURE"]
         self.solar_irradiance = 0.8  # 0–1 range
         self.wind_speed = self.config["ENVIRONMENT"]["BASE_WIND_SPEED"]
+        self._rng = np.random.default_rng()
+
+        # Config values are invariant for the agent's lifetime
+        env = self.config["ENVIRONMENT"]
+        self._base_wind = float(env["BASE_WIND_SPEED"])
+        wind_lo, wind_hi = env["WIND_NOISE_RANGE"]
+        self._wind_lo = float(wind_lo)
+        self._wind_hi = float(wind_hi)
+        self._base_temp = float(env["BASE_TEMPERATURE"])
+        self._temp_var = float(env["TEMP_VARIATION"])
 
     async def setup(self):
         """
         Setup the agent by adding the behavior that listens for environment
-        update requests from GridNode agents.
+        update requests from GridNode agents. The behaviour is bound to a
+        template so it is only woken up by matching messages.
         """
-        self.add_behaviour(self.UpdateListener())
+        template = Template(metadata={"type": "request_environment_update"})
+        self.add_behaviour(self.UpdateListener(), template)
 
     def _calculate_environment(self, sim_hour):
         """
@@ -51,83 +85,115 @@ class EnvironmentAgent(spade.agent.Agent):
         Args:
             sim_hour (int): Simulated hour of the day (0–23).
         """
-        # Solar irradiance based on hour (0–1 curve)
-        if 6 <= sim_hour <= 18:
-            peak = 12
-            self.solar_irradiance = max(
-                0.0,
-                1
-                - ((sim_hour - peak) / 6) ** 2
-                + random.uniform(-0.05, 0.05)
-            )
-        else:
-            self.solar_irradiance = 0.0
-
-        # Wind speed variation (Gaussian-like noise)
-        base_wind = self.config["ENVIRONMENT"]["BASE_WIND_SPEED"]
-        wind_noise_min, wind_noise_max = self.config["ENVIRONMENT"]["WIND_NOISE_RANGE"]
-        self.wind_speed = max(
-            0.0,
-            base_wind + random.uniform(wind_noise_min, wind_noise_max)
+        # One batched draw for the solar, wind and temperature noise
+        u_solar, u_wind, u_temp = self._rng.random(3).tolist()
+
+        solar, wind, temp = _env_kernel(
+            sim_hour,
+            self._base_temp,
+            self._temp_var,
+            self._base_wind,
+            self._wind_lo,
+            self._wind_hi,
+            u_solar,
+            u_wind,
+            u_temp,
         )
 
-        # Temperature based on realistic daily cycle
-        base_temp = self.config["ENVIRONMENT"]["BASE_TEMPERATURE"]
-        temp_variation = self.config["ENVIRONMENT"]["TEMP_VARIATION"]
-
-        if 0 <= sim_hour < 6:
-            offset = -0.6
-        elif 6 <= sim_hour < 9:
-            offset = -0.2
-        elif 9 <= sim_hour < 15:
-            offset = 0.4
-        elif 15 <= sim_hour < 18:
-            offset = 0.2
-        else:
-            offset = -0.1
-
-        temp_center = base_temp + offset * temp_variation
-        temp_range = temp_variation * 0.2
-
-        self.temperature_c = round(
-            random.uniform(temp_center - temp_range, temp_center + temp_range), 1
-        )
+        self.solar_irradiance = float(solar)
+        self.wind_speed = float(wind)
+        self.temperature_c = float(temp)
 
     class UpdateListener(CyclicBehaviour):
         """
         Cyclic behaviour that listens for environment update requests sent
         by GridNode agents. When a request is received, the environment is
         recalculated and broadcast to all subscribed agents.
+
+        Only request_environment_update messages reach this behaviour; the
+        filtering is done by the template it is registered with.
         """
 
         async def run(self):
-            msg = await self.receive(timeout=1.0)
+            msg = await self.receive(timeout=30.0)
             if not msg:
                 return
 
-            msg_type = msg.metadata.get("type", "")
-
-            if msg_type == "request_environment_update":
-                data = json.loads(msg.body)
-                sim_hour = data.get("sim_hour", 12)
-
-                # Compute new environmental conditions
-                self.agent._calculate_environment(sim_hour)
-
-                # Data to broadcast
-                broadcast_data = {
-                    "solar_irradiance": self.agent.solar_irradiance,
-                    "wind_speed": self.agent.wind_speed,
-                    "temperature_c": self.agent.temperature_c,
-                    "sim_hour": sim_hour,
-                }
-
-                # Send to all subscribed agents
-                for target_jid in self.agent.broadcast_list:
-                    env_msg = Message(to=target_jid)
-                    env_msg.metadata = {
-                        "performative": "inform",
-                        "type": "environment_update",
-                    }
-                    env_msg.body = json.dumps(broadcast_data)
-                    await self.send(env_msg)
+            data = unpack_body(msg)
+            sim_hour = data.get("sim_hour", 12)
+
+            # Compute new environmental conditions
+            self.agent._calculate_environment(sim_hour)
+
+            # Encode once; the payload is identical for every subscriber
+            body, _ = pack_environment(
+                self.agent.solar_irradiance,
+                self.agent.wind_speed,
+                self.agent.temperature_c,
+                sim_hour,
+            )
+
+            # Send to all subscribed agents concurrently. Each recipient gets
+            # a fresh Message: SPADE keeps sent messages in the agent traces
+            # and hands local recipients the same object, so a message must
+            # not be changed after it has been sent.
+            await BatchSender(self).send(
+                self.agent.broadcast_list, body, _ENV_UPDATE_METADATA
+            )
+
+
+# Per-hour lookup tables for the deterministic part of the environment model
+_DAYLIGHT_LUT = np.array([1.0 if 6 <= h <= 18 else 0.0 for h in range(24)])
+_SOLAR_LUT = np.array(
+    [1.0 - ((h - 12) / 6) ** 2 if 6 <= h <= 18 else 0.0 for h in range(24)]
+)
+_TEMP_OFFSET_LUT = np.array(
+    [-0.6] * 6     # 00:00–05:59 night
+    + [-0.2] * 3   # 06:00–08:59 morning
+    + [0.4] * 6    # 09:00–14:59 midday
+    + [0.2] * 3    # 15:00–17:59 afternoon
+    + [-0.1] * 6   # 18:00–23:59 evening
+)
+
+
+@njit(cache=True, fastmath=True)
+def _env_kernel(sim_hour, base_temp, temp_variation, base_wind,
+                wind_noise_min, wind_noise_max, u_solar, u_wind, u_temp):
+    """
+    Pure numeric core of the environment model.
+
+    Args:
+        sim_hour (int): Simulated hour of the day (0–23).
+        base_temp (float): Base temperature in Celsius.
+        temp_variation (float): Amplitude of the daily temperature cycle.
+        base_wind (float): Base wind speed.
+        wind_noise_min (float): Lower bound of the wind noise.
+        wind_noise_max (float): Upper bound of the wind noise.
+        u_solar (float): Uniform sample in [0, 1) for the solar noise.
+        u_wind (float): Uniform sample in [0, 1) for the wind noise.
+        u_temp (float): Uniform sample in [0, 1) for the temperature noise.
+
+    Returns:
+        tuple[float, float, float]: Solar irradiance, wind speed and
+        temperature.
+    """
+    hour = sim_hour % 24
+
+    # Solar irradiance based on hour (0–1 curve, noise only in daylight)
+    solar = max(
+        0.0,
+        _SOLAR_LUT[hour] + _DAYLIGHT_LUT[hour] * (-0.05 + 0.1 * u_solar),
+    )
+
+    # Wind speed variation (Gaussian-like noise)
+    wind = max(
+        0.0,
+        base_wind + wind_noise_min + (wind_noise_max - wind_noise_min) * u_wind,
+    )
+
+    # Temperature based on realistic daily cycle
+    temp_center = base_temp + _TEMP_OFFSET_LUT[hour] * temp_variation
+    temp_range = temp_variation * 0.2
+    temp = temp_center - temp_range + 2.0 * temp_range * u_temp
+
+    return solar, wind, temp
@@ -1,6 +1,9 @@
 from spade.behaviour import OneShotBehaviour
-from spade.message import Message
-import json
+from agents.messaging import BatchSender, pack_body
+import time
+
+# Minimum time (seconds) left before the deadline for a CFP to be worth sending
+MIN_DEADLINE_MARGIN_S = 0.1
 
 class InviteBurstSend(OneShotBehaviour):
     """
@@ -15,6 +18,7 @@ class InviteBurstSend(OneShotBehaviour):
         Args:
             round_id (float): Identifier of the round.
             seller_jids (list[str]): List of agent JIDs to invite.
+                Duplicates are dropped, keeping the first occurrence.
             deadline_ts (float): UNIX timestamp representing the
                 deadline for sending offers.
             producers_failed (bool): Indicates whether any producer
@@ -22,23 +26,32 @@ class InviteBurstSend(OneShotBehaviour):
         """
         super().__init__()
         self.round_id = round_id
-        self.seller_jids = seller_jids
+        self.seller_jids = tuple(dict.fromkeys(seller_jids))
         self.deadline_ts = deadline_ts
         self.producers_failed = producers_failed
 
+        # The CFP payload is fully known here; encode it once up front
+        self.body, content_type = pack_body(
+            {
+                "round_id": self.round_id,
+                "deadline_ts": self.deadline_ts,
+                "producers_failed": self.producers_failed,
+            }
+        )
+        self.metadata = {
+            "performative": "cfp",
+            "type": "call_for_offers",
+            "content-type": content_type,
+        }
+
     async def run(self):
         """
         Send CFP messages to all target agents, including round id,
         deadline, and whether producers have failed.
+
+        The burst is skipped when the round deadline has already passed
+        (or is too close to be met), since every reply would be late.
         """
-        for jid in self.seller_jids:
-            msg = Message(to=jid)
-            msg.metadata = {"performative": "cfp", "type": "call_for_offers"}
-            msg.body = json.dumps(
-                {
-                    "round_id": self.round_id,
-                    "deadline_ts": self.deadline_ts,
-                    "producers_failed": self.producers_failed,
-                }
-            )
-            await self.send(msg)
+        if time.time() >= self.deadline_ts - MIN_DEADLINE_MARGIN_S:
+            return
+        await BatchSender(self).send(self.seller_jids, self.body, self.metadata)
@@ -0,0 +1,122 @@
+def storage_soc(state):
+    """
+    Read the state of charge of a storage unit from its status report.
+
+    Args:
+        state (dict): Last status report received from the storage agent.
+
+    Returns:
+        tuple[float, float, float]: Stored energy (kWh), capacity (kWh) and
+        state of charge in percent.
+    """
+    soc = state.get("soc_kwh", 0)
+    cap = state.get("cap_kwh", 1)
+    soc_pct = (soc / cap * 100) if cap > 0 else 0
+    return soc, cap, soc_pct
+
+
+def household_contribution(state):
+    """
+    Return what a household adds to the market totals.
+
+    Args:
+        state (dict): Latest household state.
+
+    Returns:
+        tuple[float, float]: Energy needed and energy available (kWh).
+    """
+    net = state["prod_kwh"] - state["demand_kwh"]
+    if net < 0:
+        return -net, 0.0
+    return 0.0, net
+
+
+def producer_contribution(state):
+    """
+    Return what a producer adds to the market totals.
+
+    Args:
+        state (dict): Latest producer state.
+
+    Returns:
+        tuple[float, float]: Energy needed and energy available (kWh).
+    """
+    prod = state["prod_kwh"]
+    if prod > 0 and state["is_operational"]:
+        return 0.0, prod
+    return 0.0, 0.0
+
+
+def storage_contribution(state, any_producer_failed):
+    """
+    Return what a storage unit adds to the market totals.
+
+    Emergency-only units sell their charge above 20% while a producer is
+    offline and otherwise top up to full; regular units sell once they are
+    at least 95% charged and buy below that.
+
+    Args:
+        state (dict): Latest storage state.
+        any_producer_failed (bool): Whether a producer is currently offline.
+
+    Returns:
+        tuple[float, float]: Energy needed and energy available (kWh).
+    """
+    soc = state["soc_kwh"]
+    cap = state["cap_kwh"]
+    soc_pct = (soc / cap * 100) if cap > 0 else 0
+
+    if state["emergency_only"]:
+        if any_producer_failed and soc_pct > 20.0:
+            return 0.0, max(0.0, soc - 0.2 * cap)
+        if soc_pct < 99.0 and not any_producer_failed:
+            need = cap - soc
+            return (need if need > 0.5 else 0.0), 0.0
+        return 0.0, 0.0
+
+    if soc_pct >= 95.0:
+        return 0.0, max(0.0, soc - 0.2 * cap)
+    return max(0.0, cap - soc), 0.0
+
+
+class MarketTotals:
+    """
+    Running market totals, updated whenever an agent reports.
+
+    Each agent's last contribution is kept so a new report only applies the
+    difference, and the round summary reads the totals without scanning
+    every agent state.
+    """
+
+    def __init__(self):
+        self.contributions = {}
+        self.total_demand = 0.0
+        self.total_available = 0.0
+        self.num_buyers = 0
+        self.num_sellers = 0
+
+    def update(self, jid, need, available):
+        """
+        Replace an agent's contribution to the totals.
+
+        Args:
+            jid (str): Agent JID.
+            need (float): Energy the agent needs (kWh).
+            available (float): Energy the agent can supply (kWh).
+        """
+        old_need, old_available = self.contributions.get(jid, (0.0, 0.0))
+        self.contributions[jid] = (need, available)
+
+        self.num_buyers += (need > 0) - (old_need > 0)
+        self.num_sellers += (available > 0) - (old_available > 0)
+
+        # Reset to exact zero when nobody contributes, so float drift from
+        # repeated deltas cannot show up as a tiny negative total
+        if self.num_buyers:
+            self.total_demand += need - old_need
+        else:
+            self.total_demand = 0.0
+        if self.num_sellers:
+            self.total_available += available - old_available
+        else:
+            self.total_available = 0.0
@@ -0,0 +1,124 @@
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover - optional dependency
+    def njit(*args, **kwargs):
+        """Fallback no-op decorator used when numba is not installed."""
+        def decorator(func):
+            return func
+        return decorator
+
+
+@njit(cache=True)
+def _grow(arr, size):
+    """
+    Return a copy of ``arr`` enlarged to ``size`` elements.
+
+    Args:
+        arr (np.ndarray): 1-D output buffer.
+        size (int): New length, at least ``len(arr)``.
+
+    Returns:
+        np.ndarray: New buffer holding the old values at its start.
+    """
+    grown = np.empty(size, arr.dtype)
+    grown[:arr.shape[0]] = arr
+    return grown
+
+
+@njit(cache=True)
+def match_offers(offer_price, offer_remaining, buyer_cap, buyer_price_max, tx_limit):
+    """
+    Greedily allocate offers to buyers, cheapest offer first.
+
+    Buyers are served in order. Each buyer takes energy from every affordable
+    offer with more than 0.01 kWh left until its deliverable cap or the
+    transmission limit is reached. ``offer_remaining`` is updated in place.
+
+    Args:
+        offer_price (np.ndarray): Offer prices (€/kWh), sorted ascending.
+        offer_remaining (np.ndarray): Deliverable kWh left for each offer.
+        buyer_cap (np.ndarray): Deliverable kWh cap for each buyer.
+        buyer_price_max (np.ndarray): Maximum price accepted by each buyer.
+        tx_limit (float): Transmission limit per buyer (kWh).
+
+    Returns:
+        tuple: Buyer indices, offer indices, allocated kWh and requested kWh
+        before the transmission limit, one entry per purchase, plus a boolean
+        array telling whether each buyer had any affordable offer.
+    """
+    n_buyers = buyer_cap.shape[0]
+    n_offers = offer_price.shape[0]
+
+    # A purchase usually empties an offer or ends its buyer's turn, but float
+    # residue in buyer_cap - total can leave a buyer a tiny remaining need
+    # and let it buy again, so this is only a starting size: the buffers
+    # grow whenever they fill up
+    size = n_offers + 2 * n_buyers
+    out_buyer = np.empty(size, np.int64)
+    out_offer = np.empty(size, np.int64)
+    out_amount = np.empty(size, np.float64)
+    out_raw = np.empty(size, np.float64)
+    affordable = np.zeros(n_buyers, np.bool_)
+
+    # Linked list of offers that still have energy, in price order; index
+    # n_offers is the list head and -1 marks the end
+    next_active = np.full(n_offers + 1, -1, np.int64)
+    last = n_offers
+    for s in range(n_offers):
+        if offer_remaining[s] > 0.01:
+            next_active[last] = s
+            last = s
+
+    # Offers [0, cutoff[b]) are the ones buyer b can afford
+    cutoff = np.searchsorted(offer_price, buyer_price_max, side="right")
+
+    k = 0
+    for b in range(n_buyers):
+        end = cutoff[b]
+        if end == 0:
+            continue
+        total = 0.0
+        prev = n_offers
+        s = next_active[prev]
+        while s >= 0:
+            if s >= end:
+                break
+            affordable[b] = True
+
+            remaining_deliverable = buyer_cap[b] - total
+            if remaining_deliverable <= 0:
+                break
+            transmission_remaining = tx_limit - total
+            if transmission_remaining <= 0:
+                break
+
+            # Both are positive here: the offer is active and the cap not reached
+            raw_allocation = min(offer_remaining[s], remaining_deliverable)
+            amount = min(raw_allocation, transmission_remaining)
+
+            if k == size:
+                size *= 2
+                out_buyer = _grow(out_buyer, size)
+                out_offer = _grow(out_offer, size)
+                out_amount = _grow(out_amount, size)
+                out_raw = _grow(out_raw, size)
+
+            out_buyer[k] = b
+            out_offer[k] = s
+            out_amount[k] = amount
+            out_raw[k] = raw_allocation
+            k += 1
+
+            offer_remaining[s] -= amount
+            total += amount
+
+            if offer_remaining[s] <= 0.01:
+                # Exhausted offers are unlinked so later buyers skip them
+                next_active[prev] = next_active[s]
+            else:
+                prev = s
+            s = next_active[s]
+
+    return out_buyer[:k], out_offer[:k], out_amount[:k], out_raw[:k], affordable
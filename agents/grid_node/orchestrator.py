@@ -1,330 +1,486 @@
-from spade.behaviour import OneShotBehaviour
+from spade.behaviour import CyclicBehaviour
 from spade.message import Message
+from collections import defaultdict
+from operator import itemgetter
+import sys
 import time
-import json
-import random
 import asyncio
+import logging
+import numpy as np
 from agents.grid_node.print_status import PrintAgentStatus
 from agents.grid_node.print_totals import PrintTotalsTable
 from agents.grid_node.invite_burst import InviteBurstSend
+from agents.grid_node.matching import match_offers
+from agents.messaging import BatchSender, dumps
+from agents.grid_node.round_log import flush_log, log
+
+
+# Shared by every accept message. SPADE does not copy metadata: Message
+# stores the dict as-is and local delivery passes the same object through,
+# so sharing is only safe because nothing ever mutates these dicts.
+_ACCEPT_CONTROL = {"performative": "accept", "type": "control_command"}
+_ACCEPT_OFFER = {"performative": "accept", "type": "offer_accept"}
+# Read-only as well: every environment update request shares it
+_ENV_UPDATE_META = {"performative": "request", "type": "request_environment_update"}
+# Fixed-shape JSON body; only the simulated hour changes between rounds
+_ENV_UPDATE_BODY = '{"command":"update","sim_hour":%d}'
+# Per-purchase tails appended to a per-buyer JSON prefix (see run())
+_PURCHASE_TAIL = ',"kw":%r,"price":%r,"from":%s}'
+_OFFER_ACCEPT_TAIL = ',"kw":%r,"price":%r}'
+
+_OFFER_LINE = "\n  %s: %.1f kWh @ €%.2f/kWh%s"
+_BLACKOUT_LINE = "\n   %s: %.0f%% fulfilled"
+_MATCH_LINES = (
+    "     • Matched with %s @ €%.2f/kWh (%.2f kWh, €%.2f)\n"
+    "        %s remaining: %.2f kWh (was %.2f kWh)"
+)
+
+# Rounds with fewer purchases than this are aggregated with plain Python
+VECTORIZE_MIN_PURCHASES = 50
+_PURCHASE_DTYPE = np.dtype([("buyer", "i4"), ("amount", "f8"), ("price", "f8")])
+
+# Demand-period emoji for each simulated hour (0–23)
+_HOUR_EMOJI = ("🌙",) * 6 + ("🌅",) * 3 + ("☀️",) * 9 + ("🌆",) * 4 + ("🌙",) * 2
+
+_RULE = "=" * 80
+_ROUND_BANNER = (
+    "\n" + _RULE + "\n"
+    "  ROUND #%d\n"
+    "  Simulated Time: Day %d - %02d:00 (%s %s)\n"
+    "  Real Time Elapsed: %.1fs\n"
+    + _RULE + "\n"
+    "🌏 Environment: Solar %.2f | Wind %.1f m/s | Temp %.1f°C\n"
+)
+
+
+def limit_suffix(limit_info, deliverable_value=None):
+    """
+    Compose the string that lists an agent's limit and deliverable capacity.
+    """
+    if not limit_info:
+        limit_info = {}
+
+    label = limit_info.get("display")
+    effective_limit = limit_info.get("effective_limit")
+
+    parts = []
+    if label:
+        parts.append(label)
+    elif effective_limit is not None:
+        parts.append(f"limit {effective_limit:.2f} kWh")
+
+    if deliverable_value is not None:
+        parts.append(f"deliverable {deliverable_value:.2f} kWh")
+
+    if not parts:
+        return ""
+
+    return " | " + " | ".join(parts)
+
+
+def format_need_line(agent_label, needs_value, limit_info, deliverable_value):
+    """
+    Build the textual description for a buyer's demand line.
+    """
+    return (
+        f"{agent_label} needs {needs_value:.2f} kWh"
+        f"{limit_suffix(limit_info, deliverable_value)}"
+    )
+
 
-class RoundOrchestrator(OneShotBehaviour):
+def summarize_purchases(round_purchases):
+    """
+    Aggregate the purchases matched during a round.
+
+    Small rounds are summed with plain Python; from VECTORIZE_MIN_PURCHASES
+    purchases on, the totals and per-buyer average prices are computed with
+    NumPy.
+
+    Args:
+        round_purchases (list[tuple[int, float, float]]): (buyer index,
+            amount in kWh, price in €/kWh) for every purchase, grouped by
+            buyer in matching order.
+
+    Returns:
+        tuple[float, float, float]: Energy traded (kWh), market value (€)
+        and the mean of the average prices paid by the matched buyers
+        (0.0 when nothing was bought).
+    """
+    if len(round_purchases) < VECTORIZE_MIN_PURCHASES:
+        total_traded = 0.0
+        total_value = 0.0
+        price_sum = 0.0
+        buyers = 0
+        current = None
+        bought = cost = 0.0
+        for buyer_idx, amount, price in round_purchases:
+            if buyer_idx != current:
+                if current is not None:
+                    total_traded += bought
+                    total_value += cost
+                    price_sum += cost / bought
+                    buyers += 1
+                current = buyer_idx
+                bought = cost = 0.0
+            bought += amount
+            cost += amount * price
+        if current is not None:
+            total_traded += bought
+            total_value += cost
+            price_sum += cost / bought
+            buyers += 1
+        avg_price = price_sum / buyers if buyers else 0.0
+        return total_traded, total_value, avg_price
+
+    arr = np.array(round_purchases, dtype=_PURCHASE_DTYPE)
+    value = arr["amount"] * arr["price"]
+    buyers, index = np.unique(arr["buyer"], return_inverse=True)
+    bought_by_buyer = np.bincount(index, weights=arr["amount"], minlength=len(buyers))
+    value_by_buyer = np.bincount(index, weights=value, minlength=len(buyers))
+    avg_price = float((value_by_buyer / bought_by_buyer).mean())
+    return float(arr["amount"].sum()), float(value.sum()), avg_price
+
+
+class RoundOrchestrator(CyclicBehaviour):
     """
     Behaviour that continuously runs energy market rounds.
 
-    Each loop corresponds to one simulation round:
+    Each run() call corresponds to one simulation round:
     - Synchronizes status reports.
     - Classifies sellers and buyers.
     - Runs the auction and matching.
     - Optionally interacts with the external grid.
     - Updates performance metrics.
     - Advances simulation time and requests a new environment update.
+
+    Only portable asyncio primitives are used, so the behaviour runs the same
+    on the default loop and on uvloop (SIMULATION.USE_UVLOOP).
     """
 
-    async def run(self):
+    async def on_start(self):
         """
-        Execute the main simulation loop, performing repeated auction
-        rounds until the agent is stopped.
+        Read the run-constant configuration once and silence the per-round
+        console output when SIMULATION.VERBOSE is off. The status and totals
+        tables are skipped when SIMULATION.VERBOSE_STATUS is off and stdout
+        is not a terminal.
         """
-        def limit_suffix(limit_info, deliverable_value=None):
-            """
-            Compose the string that lists an agent's limit and deliverable capacity.
-            """
-            if not limit_info:
-                limit_info = {}
-
-            label = limit_info.get("display")
-            effective_limit = limit_info.get("effective_limit")
-
-            parts = []
-            if label:
-                parts.append(label)
-            elif effective_limit is not None:
-                parts.append(f"limit {effective_limit:.2f} kWh")
-
-            if deliverable_value is not None:
-                parts.append(f"deliverable {deliverable_value:.2f} kWh")
-
-            if not parts:
-                return ""
+        sim_config = self.agent.config["SIMULATION"]
+        self._offers_timeout = sim_config["OFFERS_TIMEOUT"]
+        self._round_sleep = sim_config["ROUND_SLEEP_SECONDS"]
+        self._battery_cap = self.agent.config["HOUSEHOLDS"]["BATTERY_CAPACITY_KWH"]
 
-            return " | " + " | ".join(parts)
+        if not sim_config.get("VERBOSE", True):
+            log.setLevel(logging.WARNING)
 
-        def format_need_line(agent_label, needs_value, limit_info, deliverable_value):
-            """
-            Build the textual description for a buyer's demand line.
-            """
-            return (
-                f"{agent_label} needs {needs_value:.2f} kWh"
-                f"{limit_suffix(limit_info, deliverable_value)}"
-            )
-        while True:
-            R = time.time()
-            self.agent.round_id = R
-            self.agent.round_start_ts = R
-
-            elapsed_real = R - self.agent.simulation_start_ts
-            demand_period = self.agent._get_demand_period(self.agent.sim_hour)
-            period_emoji = self._get_period_emoji(self.agent.sim_hour)
-
-            print("\n" + "=" * 80)
-            print(f"  ROUND #{self.agent.round_counter}")
-            print(
-                f"  Simulated Time: Day {self.agent.sim_day} - "
-                f"{self.agent.sim_hour:02d}:00 ({period_emoji} {demand_period})"
-            )
-            print(f"  Real Time Elapsed: {elapsed_real:.1f}s")
-            print("=" * 80)
-            print(
-                "🌏 Environment: "
-                f"Solar {self.agent.current_solar:.2f} | "
-                f"Wind {self.agent.current_wind:.1f} m/s | "
-                f"Temp {self.agent.current_temp:.1f}°C\n"
-            )
+        # Quiet runs redirected to a file or pipe skip the per-agent dumps
+        self._print_tables = (
+            sim_config.get("VERBOSE_STATUS", True) or sys.stdout.isatty()
+        )
 
-            # Wait for status reports (or until grace time expires)
-            grace = self.agent.status_grace_s
-            while True:
-                await asyncio.sleep(0.1)
-                expected = (
-                    self.agent.known_households
-                    | self.agent.known_producers
-                    | self.agent.known_storage
-                )
-                got = self.agent.status_seen_round.get(R, set())
-                all_in = len(expected) > 0 and expected.issubset(got)
-                if all_in or (
-                    time.time() - self.agent.round_start_ts >= grace and len(got) > 0
-                ):
-                    break
+    async def run(self):
+        """
+        Run one auction round. SPADE calls this again for the next round
+        until the agent is stopped.
+        """
+        agent = self.agent
+        # Auction events of the round are logged together once it settles
+        round_events = []
+
+        # round_id stays a wall-clock timestamp: it travels in every message
+        R = time.time()
+        agent.round_id = R
+        agent.round_start_ts = time.monotonic()
+
+        elapsed_real = R - agent.simulation_start_ts
+        demand_period = agent._get_demand_period(agent.sim_hour)
+        period_emoji = self._get_period_emoji(agent.sim_hour)
+
+        log.info(
+            _ROUND_BANNER,
+            agent.round_counter,
+            agent.sim_day,
+            agent.sim_hour,
+            period_emoji,
+            demand_period,
+            elapsed_real,
+            agent.current_solar,
+            agent.current_wind,
+            agent.current_temp,
+        )
+
+        # Wait for status reports (or until grace time expires)
+        grace = agent.status_grace_s
+
+        # The receiver sets the complete event once every expected agent
+        # has reported for this round
+        agent.status_expected = agent.known_agents()
+        agent.status_complete_event.clear()
+        agent.status_any_event.clear()
+
+        flush_log()
+        remaining = grace - (time.monotonic() - agent.round_start_ts)
+        try:
+            await asyncio.wait_for(
+                agent.status_complete_event.wait(),
+                timeout=max(0.0, remaining),
+            )
+        except asyncio.TimeoutError:
+            # Grace expired: proceed as soon as at least one report is in
+            await agent.status_any_event.wait()
 
-            # Check for potential producer failures
-            self.agent._check_and_trigger_failure()
+        # Check for potential producer failures
+        agent._check_and_trigger_failure()
 
-            # Print agent status snapshot
+        # Print agent status snapshot
+        if self._print_tables:
             print_status = PrintAgentStatus()
-            self.agent.add_behaviour(print_status)
-            await asyncio.sleep(0.2)
-
-            # Determine potential sellers
-            sellers = set()
-
-            # Producers
-            for p_jid, state in self.agent.producers_state.items():
-                prod = state.get("prod_kwh", 0)
-                operational = state.get("is_operational", True)
-                if prod > 0.01 and operational:
-                    sellers.add(p_jid)
-
-            # Prosumers (households with surplus)
-            for h_jid, state in self.agent.households_state.items():
-                prod_kwh = state.get("prod_kwh", 0)
-                demand_kwh = state.get("demand_kwh", 0)
-                if prod_kwh > demand_kwh:
-                    sellers.add(h_jid)
-
-            # Storage units as potential sellers
-            for s_jid, state in self.agent.storage_state.items():
-                soc = state.get("soc_kwh", 0)
-                cap = state.get("cap_kwh", 1)
-                soc_pct = (soc / cap * 100) if cap > 0 else 0
-                emergency_only = state.get("emergency_only", False)
-
-                if emergency_only:
-                    if self.agent.any_producer_failed and soc_pct > 20.0:
+            agent.add_behaviour(print_status)
+            await print_status.join()
+
+        # Classify sellers and real buyers in a single pass per state dict
+        sellers = set()
+        real_buyers = set()
+        emergency_only_storage = agent.emergency_storage_jids
+        any_failed = agent.any_producer_failed
+
+        # Producers: operational with production to offer
+        producers = agent.producer_arrays
+        if len(producers):
+            sellers.update(
+                producers.select(
+                    (producers.column("prod_kwh") > 0.01)
+                    & (producers.column("is_operational") != 0.0)
+                )
+            )
+
+        # Households: prosumers with surplus sell, the rest with a deficit buy
+        households = agent.household_arrays
+        if len(households):
+            prod_kwh = households.column("prod_kwh")
+            demand_kwh = households.column("demand_kwh")
+            sellers.update(households.select(prod_kwh > demand_kwh))
+            real_buyers.update(households.select(demand_kwh > prod_kwh))
+
+        # Storage units
+        for s_jid, (soc, cap, soc_pct) in agent.storage_levels.items():
+            if s_jid in emergency_only_storage:
+                if any_failed:
+                    if soc_pct > 20.0:
                         sellers.add(s_jid)
-                else:
-                    if soc_pct >= 95.0:
-                        avail = soc - 0.2 * cap
-                        if avail > 0:
-                            sellers.add(s_jid)
+                elif soc_pct < 99.0:
+                    real_buyers.add(s_jid)
+            elif soc_pct >= 95.0:
+                if soc - 0.2 * cap > 0:
+                    sellers.add(s_jid)
+            else:
+                real_buyers.add(s_jid)
 
-            self.agent.invited_round[R] = set(sellers)
+        # sellers is not modified past this point, so it can be shared
+        agent.invited_round[R] = sellers
 
-            # Print aggregate totals table
+        # Print aggregate totals table
+        if self._print_tables:
             print_table = PrintTotalsTable(R)
-            self.agent.add_behaviour(print_table)
-            await asyncio.sleep(0.2)
-
-            # Determine real buyers (households and storage)
-            real_buyers = set()
-
-            # Households needing energy
-            for h_jid, state in self.agent.households_state.items():
-                demand = state.get("demand_kwh", 0)
-                prod = state.get("prod_kwh", 0)
-                if demand > prod:
-                    real_buyers.add(h_jid)
-
-            # Storage units needing energy
-            for s_jid, state in self.agent.storage_state.items():
-                soc = state.get("soc_kwh", 0)
-                cap = state.get("cap_kwh", 1)
-                soc_pct = (soc / cap * 100) if cap > 0 else 0
-                emergency_only = state.get("emergency_only", False)
-
-                if emergency_only:
-                    if soc_pct < 99.0 and not self.agent.any_producer_failed:
-                        real_buyers.add(s_jid)
-                else:
-                    if soc_pct < 95.0:
-                        real_buyers.add(s_jid)
-
-            num_potential_buyers = len(real_buyers)
+            agent.add_behaviour(print_table)
+            await print_table.join()
 
-            # Send Call for Proposals only to eligible sellers and buyers
-            eligible_for_cfp = sellers.copy()
-            eligible_for_cfp.update(real_buyers)
+        num_potential_buyers = len(real_buyers)
 
-            if len(eligible_for_cfp) > 0:
-                print("⚙️  AUCTION PROCESS:\n")
-                print("➡️  Broadcasting Call for Proposals to eligible agents...")
-                print(
-                    f"  {len(sellers)} eligible sellers | "
-                    f"{num_potential_buyers} potential buyers"
-                )
-                offers_timeout = self.agent.config["SIMULATION"]["OFFERS_TIMEOUT"]
-                print(
-                    f"  Waiting for responses "
-                    f"({offers_timeout}s deadline)...\n"
-                )
+        # Send Call for Proposals only to eligible sellers and buyers
+        eligible_for_cfp = sellers | real_buyers
 
-                self.agent.round_deadline_ts = time.time() + offers_timeout
-                burst = InviteBurstSend(
-                    R,
-                    list(eligible_for_cfp),
-                    self.agent.round_deadline_ts,
-                    self.agent.any_producer_failed,
+        if len(eligible_for_cfp) > 0:
+            log.info("⚙️  AUCTION PROCESS:\n")
+            log.info("➡️  Broadcasting Call for Proposals to eligible agents...")
+            log.info(
+                "  %s eligible sellers | %s potential buyers",
+                len(sellers),
+                num_potential_buyers,
+            )
+            offers_timeout = self._offers_timeout
+            log.info("  Waiting for responses (%ss deadline)...\n", offers_timeout)
+
+            # The wall-clock deadline is sent to the other agents, which
+            # compare it with their own clock; local checks use monotonic time
+            agent.round_deadline_ts = time.time() + offers_timeout
+            agent.round_deadline_mono = time.monotonic() + offers_timeout
+            agent.cfp_recipients = frozenset(eligible_for_cfp)
+            agent.cfp_responded = set()
+            agent.offers_complete_event.clear()
+            burst = InviteBurstSend(
+                R,
+                list(eligible_for_cfp),
+                agent.round_deadline_ts,
+                agent.any_producer_failed,
+            )
+            agent.add_behaviour(burst)
+            flush_log()
+
+            # Stop waiting as soon as every invited agent has answered, and
+            # never past the deadline advertised in the CFP
+            try:
+                await asyncio.wait_for(
+                    agent.offers_complete_event.wait(),
+                    max(0.0, agent.round_deadline_mono - time.monotonic()),
                 )
-                self.agent.add_behaviour(burst)
-                await asyncio.sleep(offers_timeout)
-            else:
-                print("⚙️ No agents available for auction.\n")
-
-            # Collect offers and requests for this round
-            offers = self.agent.offers_round.get(R, {})
-            reqs = list(self.agent.requests_round.get(R, {}).items())
-            req_lookup = dict(reqs)
-            declined = self.agent.declined_round.get(R, set())
-
-            seller_limit_info = {}
-            seller_initial_deliverable = {}
-            for seller, offer_data in offers.items():
-                limit_info = self.agent.get_operational_limit_info(seller, "sell")
-                seller_limit_info[seller] = limit_info
-                limit_value = limit_info.get("effective_limit")
-                offer_amount = offer_data["offer_kwh"]
-                deliverable_offer = offer_amount
-                if limit_value is not None:
-                    deliverable_offer = min(deliverable_offer, limit_value)
-                deliverable_offer = max(0.0, deliverable_offer)
-                seller_initial_deliverable[seller] = deliverable_offer
-
-            print(f"📩 OFFERS RECEIVED ({len(offers)} of {len(sellers)} invited):")
-            for seller, offer_data in offers.items():
-                kwh = offer_data["offer_kwh"]
-                price = offer_data["price"]
-                deliverable_offer = seller_initial_deliverable.get(seller, kwh)
-                limit_note = limit_suffix(
-                    seller_limit_info.get(seller), deliverable_offer
+            except asyncio.TimeoutError:
+                pass
+        else:
+            log.info("⚙️ No agents available for auction.\n")
+
+        # Collect offers and requests for this round
+        offers = agent.offers_round.get(R, {})
+        # Requests are read in place; the count is fixed before any await
+        # so late arrivals cannot change this round's summary
+        req_map = agent.requests_round.get(R, {})
+        num_reqs = len(req_map)
+        declined = agent.declined_round.get(R, set())
+
+        # Operational limits do not change within a round: resolve each
+        # participant once and share the result between both sides
+        round_limits = {}
+        for jid in offers:
+            round_limits[jid] = agent.get_operational_limit_info(jid, "sell")
+        for jid in req_map:
+            if jid not in round_limits:
+                round_limits[jid] = agent.get_operational_limit_info(
+                    jid, "buy"
                 )
-                print(
-                    f"  {seller}: {kwh:.1f} kWh @ €{price:.2f}/kWh{limit_note}"
+        effective_limits = {
+            jid: info.get("effective_limit") for jid, info in round_limits.items()
+        }
+
+        seller_limit_info = round_limits
+        seller_initial_deliverable = {}
+        for seller, offer_data in offers.items():
+            limit_value = effective_limits[seller]
+            offer_amount = offer_data.offer_kwh
+            deliverable_offer = offer_amount
+            if limit_value is not None:
+                deliverable_offer = min(deliverable_offer, limit_value)
+            deliverable_offer = max(0.0, deliverable_offer)
+            seller_initial_deliverable[seller] = deliverable_offer
+
+        # Header and offer lines are emitted as a single record
+        offer_args = [len(offers), len(sellers)]
+        for seller, offer_data in offers.items():
+            kwh = offer_data.offer_kwh
+            deliverable_offer = seller_initial_deliverable.get(seller, kwh)
+            limit_note = limit_suffix(
+                seller_limit_info.get(seller), deliverable_offer
+            )
+            offer_args.extend((seller, kwh, offer_data.price, limit_note))
+        log.info(
+            "📩 OFFERS RECEIVED (%s of %s invited):"
+            + _OFFER_LINE * len(offers),
+            *offer_args,
+        )
+
+        if len(declined) > 0:
+            log.info("\n📭 NO RESPONSE (%s):", len(declined))
+            for agent_jid in declined:
+                log.info("  %s (declined to participate)", agent_jid)
+
+        log.info("\n🤝 MATCHING:\n")
+
+        # Matching algorithm with partial allocation support
+        matched_count = 0
+        partial_count = 0
+        unmatched_count = 0
+        round_purchases = []
+        matched_buyers = set()
+        buyer_fulfillment = {}
+        # Missing buyers read as 0.0 kWh received; lookups below use .get()
+        # so that only buyers that received energy get an entry
+        buyer_received_kw = defaultdict(float)
+
+        seller_remaining = dict(seller_initial_deliverable)
+
+        buyer_caps = {}
+
+        # Accept notifications are collected and dispatched together
+        pending_msgs = []
+
+        # All buyers see the same offers: order them by price once
+        offers_by_price = sorted(
+            offers.items(), key=lambda item: (item[1].price, item[0])
+        )
+
+        # Matcher inputs are gathered in the same passes that build the
+        # per-buyer caps and the sorted offers
+        total_demand = 0
+        cap_values = []
+        price_max_values = []
+        for buyer, req_data in req_map.items():
+            need_kwh = req_data.need_kwh
+            total_demand += need_kwh
+            limit_value = effective_limits[buyer]
+            deliverable_cap = need_kwh
+            if limit_value is not None and limit_value < deliverable_cap:
+                deliverable_cap = limit_value
+            if deliverable_cap < 0.0:
+                deliverable_cap = 0.0
+            buyer_caps[buyer] = {
+                "limit_info": round_limits[buyer],
+                "deliverable_cap": deliverable_cap,
+            }
+            cap_values.append(deliverable_cap)
+            price_max_values.append(req_data.price_max)
+
+        offer_prices = []
+        offer_deliverable = []
+        for seller, offer_data in offers_by_price:
+            offer_prices.append(offer_data.price)
+            offer_deliverable.append(seller_remaining[seller])
+
+        # Allocation runs on plain arrays; the results are replayed below
+        # for logging, events and notifications
+        m_buyer, m_offer, m_amount, m_raw, affordable = match_offers(
+            np.array(offer_prices, dtype=np.float64),
+            np.array(offer_deliverable, dtype=np.float64),
+            np.array(cap_values, dtype=np.float64),
+            np.array(price_max_values, dtype=np.float64),
+            float(agent.transmission_limit_kw),
+        )
+        affordable = affordable.tolist()
+        buyer_matches = defaultdict(list)
+        for b_idx, s_idx, amount, raw_allocation in zip(
+            m_buyer.tolist(), m_offer.tolist(), m_amount.tolist(), m_raw.tolist()
+        ):
+            buyer_matches[b_idx].append((s_idx, amount, raw_allocation))
+
+        for buyer_idx, (buyer, req_data) in enumerate(req_map.items()):
+            need_kwh = req_data.need_kwh
+            deliverable_cap = cap_values[buyer_idx]
+            limit_info = buyer_caps[buyer]["limit_info"]
+
+            if not affordable[buyer_idx]:
+                log.info(
+                    "  ⚠️  %s",
+                    format_need_line(buyer, need_kwh, limit_info, deliverable_cap),
                 )
-
-            if len(declined) > 0:
-                print(f"\n📭 NO RESPONSE ({len(declined)}):")
-                for agent_jid in declined:
-                    print(f"  {agent_jid} (declined to participate)")
-
-            print("\n🤝 MATCHING:\n")
-
-            # Matching algorithm with partial allocation support
-            matched_count = 0
-            partial_count = 0
-            unmatched_count = 0
-            total_traded = 0.0
-            total_value = 0.0
-            prices_paid = []
-            matched_buyers = set()
-            buyer_fulfillment = {}
-            buyer_received_kw = {buyer: 0.0 for buyer in req_lookup}
-
-            seller_remaining = {}
-            for seller, deliverable in seller_initial_deliverable.items():
-                seller_remaining[seller] = deliverable
-
-            buyer_caps = {}
-
-            for buyer, req_data in reqs:
-                need_kwh = req_data["need_kwh"]
-                price_max = req_data["price_max"]
-                limit_info = self.agent.get_operational_limit_info(buyer, "buy")
-                limit_value = limit_info.get("effective_limit")
-                deliverable_cap = need_kwh
-                if limit_value is not None:
-                    deliverable_cap = min(deliverable_cap, limit_value)
-                deliverable_cap = max(0.0, deliverable_cap)
-                buyer_caps[buyer] = {
-                    "limit_info": limit_info,
-                    "deliverable_cap": deliverable_cap,
-                }
-
-                # Sellers the buyer can afford
-                available_sellers = []
-                for seller, offer_data in offers.items():
-                    if (
-                        seller_remaining[seller] > 0.01
-                        and offer_data["price"] <= price_max
-                    ):
-                        available_sellers.append(
-                            (offer_data["price"], seller, offer_data)
-                        )
-
-                if not available_sellers:
-                    print(
-                        "  ⚠️  "
-                        + format_need_line(
-                            buyer, need_kwh, limit_info, deliverable_cap
-                        )
-                    )
-                    print("     → No match (no affordable sellers)\n")
-                    unmatched_count += 1
-                    buyer_fulfillment[buyer] = 0.0
-                    continue
-
-                available_sellers.sort()
-
-                total_bought = 0.0
-                total_cost = 0.0
-                purchases = []
-
-                for price, seller, offer_data in available_sellers:
-                    available = seller_remaining[seller]
-                    remaining_deliverable = max(0.0, deliverable_cap - total_bought)
-                    transmission_remaining = max(
-                        0.0, self.agent.transmission_limit_kw - total_bought
+                log.info("     → No match (no affordable sellers)\n")
+                unmatched_count += 1
+                buyer_fulfillment[buyer] = 0.0
+                continue
+
+            total_bought = 0.0
+            total_cost = 0.0
+            purchases = []
+
+            for s_idx, amount, raw_allocation in buyer_matches.get(buyer_idx, ()):
+                seller, offer_data = offers_by_price[s_idx]
+                price = offer_data.price
+
+                if amount < raw_allocation:
+                    log_msg = (
+                        "⚠️ [TRANSMISSION LIMIT] Original offer of "
+                        f"{raw_allocation:.2f} kWh limited to "
+                        f"{amount:.2f} kWh."
                     )
-
-                    if remaining_deliverable <= 0 or transmission_remaining <= 0:
-                        break
-
-                    raw_allocation = min(available, remaining_deliverable)
-                    if raw_allocation <= 0:
-                        continue
-
-                    amount = min(raw_allocation, transmission_remaining)
-                    if amount <= 0:
-                        break
-
-                    if amount < raw_allocation:
-                        log_msg = (
-                            "⚠️ [TRANSMISSION LIMIT] Original offer of "
-                            f"{raw_allocation:.2f} kWh limited to "
-                            f"{amount:.2f} kWh."
-                        )
-                        print(f"        {log_msg}")
-                        self.agent._add_event(
+                    log.info("        %s", log_msg)
+                    round_events.append(
+                        (
                             "transmission_limit",
                             buyer,
                             {
@@ -335,97 +491,104 @@ class RoundOrchestrator(OneShotBehaviour):
                             price,
                             R,
                         )
+                    )
 
-                    seller_remaining[seller] -= amount
-                    total_bought += amount
-                    cost = amount * price
-                    total_cost += cost
-                    purchases.append((seller, amount, price, cost))
-
-                demand_line = format_need_line(
-                    buyer, need_kwh, limit_info, deliverable_cap
-                )
-
-                if total_bought > 0:
-                    fulfillment_pct = (total_bought / need_kwh) * 100
-                    buyer_received_kw[buyer] = total_bought
-                    buyer_fulfillment[buyer] = fulfillment_pct
+                seller_remaining[seller] -= amount
+                total_bought += amount
+                cost = amount * price
+                total_cost += cost
+                purchases.append((seller, amount, price, cost))
 
-                    if fulfillment_pct >= 99.0:
-                        print(f"  ✅ {demand_line}")
-                        matched_count += 1
-                    else:
-                        print(f"  ⚠️ {demand_line}")
-                        partial_count += 1
+            demand_line = format_need_line(
+                buyer, need_kwh, limit_info, deliverable_cap
+            )
 
-                    for _, (seller, amount, price, cost) in enumerate(purchases):
-                        remaining_after = seller_remaining[seller]
-                        seller_before = remaining_after + amount
+            if total_bought > 0:
+                fulfillment_pct = (total_bought / need_kwh) * 100
+                buyer_received_kw[buyer] = total_bought
+                buyer_fulfillment[buyer] = fulfillment_pct
 
-                        print(
-                            f"     • Matched with {seller} @ €{price:.2f}/kWh "
-                            f"({amount:.2f} kWh, €{cost:.2f})"
-                        )
-                        print(
-                            f"        {seller} remaining: "
-                            f"{remaining_after:.2f} kWh "
-                            f"(was {seller_before:.2f} kWh)"
+                if fulfillment_pct >= 99.0:
+                    log.info("  ✅ %s", demand_line)
+                    matched_count += 1
+                else:
+                    log.info("  ⚠️ %s", demand_line)
+                    partial_count += 1
+
+                # All purchase lines of this buyer go out as one record
+                match_args = []
+                for seller, amount, price, cost in purchases:
+                    remaining_after = seller_remaining[seller]
+                    match_args.extend(
+                        (
+                            seller,
+                            price,
+                            amount,
+                            cost,
+                            seller,
+                            remaining_after,
+                            remaining_after + amount,
                         )
+                    )
+                log.info("\n".join([_MATCH_LINES] * len(purchases)), *match_args)
+
+                avg_price = total_cost / total_bought if total_bought > 0 else 0
+                log.info(
+                    "     • %s received %.2f/%.2f kWh (%.0f%% fulfilled)",
+                    buyer,
+                    total_bought,
+                    need_kwh,
+                    fulfillment_pct,
+                )
+                log.info(
+                    "     • Total cost: €%.2f (avg: €%.2f/kWh)\n",
+                    total_cost,
+                    avg_price,
+                )
 
-                    avg_price = total_cost / total_bought if total_bought > 0 else 0
-                    print(
-                        f"     • {buyer} received {total_bought:.2f}/"
-                        f"{need_kwh:.2f} kWh ({fulfillment_pct:.0f}% fulfilled)"
+                # The fields shared by all of this buyer's notifications are
+                # encoded once; each purchase only appends its own tail
+                # (amounts and prices are floats, so %r yields valid JSON)
+                buyer_prefix = dumps(
+                    {
+                        "round_id": R,
+                        "command": "energy_purchased",
+                        "partial": total_bought < need_kwh,
+                        "total_received": total_bought,
+                        "total_needed": need_kwh,
+                    }
+                )[:-1]
+                seller_prefix = dumps({"round_id": R, "buyer": buyer})[:-1]
+
+                # Notify buyer
+                for seller, amount, price, cost in purchases:
+                    buyer_msg = Message(to=buyer)
+                    buyer_msg.metadata = _ACCEPT_CONTROL
+                    buyer_msg.body = buyer_prefix + _PURCHASE_TAIL % (
+                        amount,
+                        price,
+                        dumps(seller),
                     )
-                    print(
-                        f"     • Total cost: €{total_cost:.2f} "
-                        f"(avg: €{avg_price:.2f}/kWh)\n"
+                    pending_msgs.append(buyer_msg)
+
+                # Notify sellers
+                for seller, amount, price, cost in purchases:
+                    seller_msg = Message(to=seller)
+                    seller_msg.metadata = _ACCEPT_OFFER
+                    seller_msg.body = seller_prefix + _OFFER_ACCEPT_TAIL % (
+                        amount,
+                        price,
                     )
+                    pending_msgs.append(seller_msg)
 
-                    # Notify buyer
-                    for seller, amount, price, cost in purchases:
-                        buyer_msg = Message(to=buyer)
-                        buyer_msg.metadata = {
-                            "performative": "accept",
-                            "type": "control_command",
-                        }
-                        buyer_msg.body = json.dumps(
-                            {
-                                "round_id": R,
-                                "command": "energy_purchased",
-                                "kw": amount,
-                                "price": price,
-                                "from": seller,
-                                "partial": total_bought < need_kwh,
-                                "total_received": total_bought,
-                                "total_needed": need_kwh,
-                            }
-                        )
-                        await self.send(buyer_msg)
-
-                    # Notify sellers
-                    for seller, amount, price, cost in purchases:
-                        seller_msg = Message(to=seller)
-                        seller_msg.metadata = {
-                            "performative": "accept",
-                            "type": "offer_accept",
-                        }
-                        seller_msg.body = json.dumps(
-                            {
-                                "round_id": R,
-                                "buyer": buyer,
-                                "kw": amount,
-                                "price": price,
-                            }
-                        )
-                        await self.send(seller_msg)
-
-                    matched_buyers.add(buyer)
-                    total_traded += total_bought
-                    total_value += total_cost
-                    prices_paid.append(avg_price)
+                matched_buyers.add(buyer)
+                round_purchases.extend(
+                    (buyer_idx, amount, price)
+                    for _, amount, price, _ in purchases
+                )
 
-                    self.agent._add_event(
+                round_events.append(
+                    (
                         "match",
                         buyer,
                         {
@@ -436,152 +599,145 @@ class RoundOrchestrator(OneShotBehaviour):
                         avg_price,
                         R,
                     )
-                else:
-                    print(f"  ⚠️ {demand_line}")
-                    print("     • No match\n")
-                    unmatched_count += 1
-                    buyer_fulfillment[buyer] = 0.0
-
-            # Unmet demand list
-            unmet_demand = []
-            for buyer, req_data in reqs:
-                need_kwh = req_data["need_kwh"]
-                received = buyer_received_kw.get(buyer, 0.0)
-                remaining = max(0.0, need_kwh - received)
-                fulfillment = (
-                    (received / need_kwh * 100) if need_kwh > 0 else 0.0
                 )
-                buyer_fulfillment[buyer] = fulfillment
-                if remaining > 0.01:
-                    price_max = req_data["price_max"]
-                    cap_info = buyer_caps.get(buyer, {})
-                    unmet_demand.append(
-                        (
-                            buyer,
-                            need_kwh,
-                            remaining,
-                            price_max,
-                            fulfillment,
-                            cap_info,
-                        )
+            else:
+                log.info("  ⚠️ %s", demand_line)
+                log.info("     • No match\n")
+                unmatched_count += 1
+                buyer_fulfillment[buyer] = 0.0
+
+        total_traded, total_value, avg_price_paid = summarize_purchases(
+            round_purchases
+        )
+
+        # Unmet demand list (matching already set every buyer's fulfillment)
+        unmet_demand = []
+        for buyer, req_data in req_map.items():
+            need_kwh = req_data.need_kwh
+            remaining = need_kwh - buyer_received_kw.get(buyer, 0.0)
+            if remaining > 0.01:
+                fulfillment = buyer_fulfillment[buyer]
+                price_max = req_data.price_max
+                cap_info = buyer_caps.get(buyer, {})
+                unmet_demand.append(
+                    (
+                        buyer,
+                        need_kwh,
+                        remaining,
+                        price_max,
+                        fulfillment,
+                        cap_info,
                     )
-
-            # Surplus that could be sent to external grid
-            surplus_energy = {}
-            for seller, remaining in seller_remaining.items():
-                if remaining > 0.5:
-                    if seller in self.agent.storage_state:
-                        storage_info = self.agent.storage_state[seller]
-                        if storage_info.get("emergency_only", False):
-                            continue
-                    surplus_energy[seller] = remaining
-            wasted_energy = sum(surplus_energy.values())
-
-            # External grid interaction
-            if self.agent.external_grid_enabled:
-                self.agent.external_grid_buy_price = random.uniform(
-                    self.agent.external_grid_buy_price_min,
-                    self.agent.external_grid_buy_price_max,
-                )
-                self.agent.external_grid_sell_price = random.uniform(
-                    self.agent.external_grid_sell_price_min,
-                    self.agent.external_grid_sell_price_max,
                 )
 
-                ext_available = (
-                    random.random() < self.agent.external_grid_acceptance_prob
-                )
+        # Surplus that could be sent to external grid
+        surplus_energy = {}
+        wasted_energy = 0
+        for seller, remaining in seller_remaining.items():
+            if remaining > 0.5 and seller not in emergency_only_storage:
+                surplus_energy[seller] = remaining
+                wasted_energy += remaining
+
+        # External grid interaction
+        if agent.external_grid_enabled:
+            (
+                agent.external_grid_buy_price,
+                agent.external_grid_sell_price,
+                ext_available,
+            ) = agent.next_external_grid_draw()
+
+            ext_sold_total = 0.0
+            ext_sold_value = 0.0
+            ext_bought_total = 0.0
+            ext_bought_value = 0.0
+
+            if ext_available:
+                agent.ext_grid_rounds_available += 1
+
+                if len(unmet_demand) > 0 or len(surplus_energy) > 0:
+                    log.info("\n🌐 EXTERNAL GRID AVAILABLE:")
+                    log.info(
+                        "   Buy: €%.2f/kWh | Sell: €%.2f/kWh\n",
+                        agent.external_grid_buy_price,
+                        agent.external_grid_sell_price,
+                    )
 
-                ext_sold_total = 0.0
-                ext_sold_value = 0.0
-                ext_bought_total = 0.0
-                ext_bought_value = 0.0
+                # Serve unmet demand from external grid
+                tx_limit = agent.transmission_limit_kw
+                for (
+                    buyer,
+                    need_kwh,
+                    remaining_need,
+                    price_max,
+                    current_fulfillment,
+                    cap_info,
+                ) in unmet_demand:
+                    if agent.external_grid_sell_price <= price_max:
+                        current_received = buyer_received_kw.get(buyer, 0.0)
+                        deliverable_cap = cap_info.get("deliverable_cap", need_kwh)
+                        limit_info = cap_info.get("limit_info")
+                        agent_remaining = deliverable_cap - current_received
+                        if agent_remaining <= 0:
+                            limit_note = limit_suffix(limit_info, 0.0)
+                            log.info(
+                                "  %s already at deliverable cap%s. Skipping "
+                                "external supply.",
+                                buyer,
+                                limit_note,
+                            )
+                            continue
+
+                        transmission_remaining = tx_limit - current_received
+                        if transmission_remaining <= 0:
+                            log.info(
+                                "  %s already at transmission limit (%.1f kWh). "
+                                "Skipping external supply.",
+                                buyer,
+                                tx_limit,
+                            )
+                            continue
 
-                if ext_available:
-                    self.agent.ext_grid_rounds_available += 1
+                        allowed_cap = min(agent_remaining, transmission_remaining)
+                        delivered = min(remaining_need, allowed_cap)
+                        if delivered <= 0:
+                            continue
 
-                    if len(unmet_demand) > 0 or len(surplus_energy) > 0:
-                        print("\n🌐 EXTERNAL GRID AVAILABLE:")
-                        print(
-                            f"   Buy: €{self.agent.external_grid_buy_price:.2f}/kWh | "
-                            f"Sell: €{self.agent.external_grid_sell_price:.2f}/kWh\n"
+                        total_cost = (
+                            delivered * agent.external_grid_sell_price
                         )
 
-                    # Serve unmet demand from external grid
-                    for (
-                        buyer,
-                        need_kwh,
-                        remaining_need,
-                        price_max,
-                        current_fulfillment,
-                        cap_info,
-                    ) in unmet_demand:
-                        if self.agent.external_grid_sell_price <= price_max:
-                            current_received = buyer_received_kw.get(buyer, 0.0)
-                            deliverable_cap = cap_info.get("deliverable_cap", need_kwh)
-                            limit_info = cap_info.get("limit_info")
-                            agent_remaining = max(
-                                0.0, deliverable_cap - current_received
+                        if current_fulfillment > 0:
+                            log.info(
+                                "  🌐 %s buying additional %.1f kWh from external "
+                                "grid @ €%.2f/kWh",
+                                buyer,
+                                delivered,
+                                agent.external_grid_sell_price,
                             )
-                            transmission_remaining = max(
-                                0.0,
-                                self.agent.transmission_limit_kw - current_received,
+                        else:
+                            log.info(
+                                "  🌐 %s buying %.1f kWh from external grid @ "
+                                "€%.2f/kWh",
+                                buyer,
+                                delivered,
+                                agent.external_grid_sell_price,
                             )
 
-                            if agent_remaining <= 0:
-                                limit_note = limit_suffix(
-                                    limit_info, agent_remaining
-                                )
-                                print(
-                                    f"  {buyer} already at deliverable cap"
-                                    f"{limit_note}. Skipping external supply."
-                                )
-                                continue
-
-                            if transmission_remaining <= 0:
-                                print(
-                                    f"  {buyer} already at transmission limit "
-                                    f"({self.agent.transmission_limit_kw:.1f} kWh). "
-                                    "Skipping external supply."
-                                )
-                                continue
-
-                            allowed_cap = min(agent_remaining, transmission_remaining)
-                            delivered = min(remaining_need, allowed_cap)
-                            if delivered <= 0:
-                                continue
-
-                            total_cost = (
-                                delivered * self.agent.external_grid_sell_price
+                        if delivered < remaining_need:
+                            reasons = []
+                            if agent_remaining < remaining_need:
+                                reasons.append("agent deliverable cap")
+                            if transmission_remaining < remaining_need:
+                                reasons.append("transmission limit")
+                            reason_text = " & ".join(reasons) or "capacity cap"
+                            log_msg = (
+                                f"[{reason_text.upper()}] Original demand of "
+                                f"{remaining_need:.1f} kWh limited to "
+                                f"{delivered:.1f} kWh."
                             )
-
-                            if current_fulfillment > 0:
-                                print(
-                                    f"  🌐 {buyer} buying additional "
-                                    f"{delivered:.1f} kWh from external grid "
-                                    f"@ €{self.agent.external_grid_sell_price:.2f}/kWh"
-                                )
-                            else:
-                                print(
-                                    f"  🌐 {buyer} buying {delivered:.1f} kWh from "
-                                    "external grid "
-                                    f"@ €{self.agent.external_grid_sell_price:.2f}/kWh"
-                                )
-
-                            if delivered < remaining_need:
-                                reasons = []
-                                if agent_remaining < remaining_need:
-                                    reasons.append("agent deliverable cap")
-                                if transmission_remaining < remaining_need:
-                                    reasons.append("transmission limit")
-                                reason_text = " & ".join(reasons) or "capacity cap"
-                                log_msg = (
-                                    f"[{reason_text.upper()}] Original demand of "
-                                    f"{remaining_need:.1f} kWh limited to "
-                                    f"{delivered:.1f} kWh."
-                                )
-                                print(f"     {log_msg}")
-                                self.agent._add_event(
+                            log.info("     %s", log_msg)
+                            round_events.append(
+                                (
                                     "transmission_limit",
                                     buyer,
                                     {
@@ -590,150 +746,279 @@ class RoundOrchestrator(OneShotBehaviour):
                                         "delivered_kwh": delivered,
                                         "reasons": reasons,
                                     },
-                                    self.agent.external_grid_sell_price,
+                                    agent.external_grid_sell_price,
                                     R,
                                 )
-                            else:
-                                print(
-                                    "     Completing partially fulfilled order: "
-                                    f"was {current_fulfillment:.0f}%, now 100%."
-                                )
-
-                            print(f"     Total cost: €{total_cost:.2f}")
-
-                            buyer_msg = Message(to=buyer)
-                            buyer_msg.metadata = {
-                                "performative": "accept",
-                                "type": "control_command",
-                            }
-                            buyer_msg.body = json.dumps(
-                                {
-                                    "round_id": R,
-                                    "command": "energy_purchased",
-                                    "kw": delivered,
-                                    "price": self.agent.external_grid_sell_price,
-                                    "from": "external_grid",
-                                }
-                            )
-                            await self.send(buyer_msg)
-
-                            buyer_received_kw[buyer] = current_received + delivered
-
-                            self.agent.ext_grid_total_sold_kwh += delivered
-                            self.agent.ext_grid_revenue += total_cost
-                            ext_sold_total += delivered
-                            ext_sold_value += total_cost
-
-                            # Update fulfillment
-                            new_total = buyer_received_kw[buyer]
-                            fulfillment_pct = (
-                                (new_total / need_kwh * 100)
-                                if need_kwh > 0
-                                else 0.0
-                            )
-                            buyer_fulfillment[buyer] = min(100.0, fulfillment_pct)
-                            print(
-                                f"     Final fulfillment: {buyer_fulfillment[buyer]:.0f}%"
                             )
                         else:
-                            print(
-                                f"  {buyer} cannot afford external grid for remaining "
-                                f"{remaining_need:.1f} kWh"
-                            )
-                            print(
-                                f"     (€{self.agent.external_grid_sell_price:.2f}/kWh "
-                                f"> max €{price_max:.2f}/kWh)"
+                            log.info(
+                                "     Completing partially fulfilled order: was "
+                                "%.0f%%, now 100%%.",
+                                current_fulfillment,
                             )
 
-                    # Sell surplus to external grid
-                    for seller, surplus_kwh in surplus_energy.items():
-                        total_revenue = (
-                            surplus_kwh * self.agent.external_grid_buy_price
-                        )
-
-                        print(
-                            f"  🌐 {seller} selling {surplus_kwh:.1f} kWh to "
-                            "external grid "
-                            f"@ €{self.agent.external_grid_buy_price:.2f}/kWh"
-                        )
-                        print(f"     Total revenue: €{total_revenue:.2f}")
+                        log.info("     Total cost: €%.2f", total_cost)
 
-                        seller_msg = Message(to=seller)
-                        seller_msg.metadata = {
-                            "performative": "accept",
-                            "type": "offer_accept",
-                        }
-                        seller_msg.body = json.dumps(
+                        buyer_msg = Message(to=buyer)
+                        buyer_msg.metadata = _ACCEPT_CONTROL
+                        buyer_msg.body = dumps(
                             {
                                 "round_id": R,
-                                "buyer": "external_grid",
-                                "kw": surplus_kwh,
-                                "price": self.agent.external_grid_buy_price,
+                                "command": "energy_purchased",
+                                "kw": delivered,
+                                "price": agent.external_grid_sell_price,
+                                "from": "external_grid",
                             }
                         )
-                        await self.send(seller_msg)
-
-                        self.agent.ext_grid_total_bought_kwh += surplus_kwh
-                        self.agent.ext_grid_costs += total_revenue
-                        ext_bought_total += surplus_kwh
-                        ext_bought_value += total_revenue
-                        wasted_energy -= surplus_kwh
-
-                    if ext_sold_total > 0 or ext_bought_total > 0:
-                        print("\n🌐 [External Grid Summary]")
-                        if ext_sold_total > 0:
-                            print(
-                                "    Sold to microgrid: "
-                                f"{ext_sold_total:.1f} kWh "
-                                f"@ €{self.agent.external_grid_sell_price:.2f}/kWh "
-                                f"= €{ext_sold_value:.2f}"
-                            )
-                        if ext_bought_total > 0:
-                            print(
-                                "    Bought from microgrid: "
-                                f"{ext_bought_total:.1f} kWh "
-                                f"@ €{self.agent.external_grid_buy_price:.2f}/kWh "
-                                f"= €{ext_bought_value:.2f}"
-                            )
+                        pending_msgs.append(buyer_msg)
 
-                else:
-                    self.agent.ext_grid_rounds_unavailable += 1
-
-                    if len(unmet_demand) > 0 or len(surplus_energy) > 0:
-                        print("\n🚫 EXTERNAL GRID UNAVAILABLE:\n")
-            
-                        if len(surplus_energy) > 0:
-                            print("⚡️ Wasted surplus (curtailed):")
-                            for seller, surplus_kwh in surplus_energy.items():
-                                print(
-                                    f" {seller}: {surplus_kwh:.1f} kWh not sold"
-                                )
+                        buyer_received_kw[buyer] += delivered
+                        new_total = current_received + delivered
 
-            blackout_impacted = sum(
-                1 for pct in buyer_fulfillment.values() if pct < 99.0
-            )
-            avg_fulfillment = (
-                sum(buyer_fulfillment.values()) / len(buyer_fulfillment)
-                if buyer_fulfillment
-                else 0.0
-            )
-            blackout_round = blackout_impacted > 0
+                        agent.ext_grid_total_sold_kwh += delivered
+                        agent.ext_grid_revenue += total_cost
+                        ext_sold_total += delivered
+                        ext_sold_value += total_cost
 
-            # Collect performance metrics for this round
-            round_data = {
-                "total_demand": sum(
-                    req_data["need_kwh"] for _, req_data in reqs
+                        # Update fulfillment
+                        fulfillment_pct = (
+                            (new_total / need_kwh * 100)
+                            if need_kwh > 0
+                            else 0.0
+                        )
+                        buyer_fulfillment[buyer] = min(100.0, fulfillment_pct)
+                        log.info(
+                            "     Final fulfillment: %.0f%%",
+                            buyer_fulfillment[buyer],
+                        )
+                    else:
+                        log.info(
+                            "  %s cannot afford external grid for remaining %.1f "
+                            "kWh",
+                            buyer,
+                            remaining_need,
+                        )
+                        log.info(
+                            "     (€%.2f/kWh > max €%.2f/kWh)",
+                            agent.external_grid_sell_price,
+                            price_max,
+                        )
+
+                # Sell surplus to external grid
+                for seller, surplus_kwh in surplus_energy.items():
+                    total_revenue = (
+                        surplus_kwh * agent.external_grid_buy_price
+                    )
+
+                    log.info(
+                        "  🌐 %s selling %.1f kWh to external grid @ €%.2f/kWh",
+                        seller,
+                        surplus_kwh,
+                        agent.external_grid_buy_price,
+                    )
+                    log.info("     Total revenue: €%.2f", total_revenue)
+
+                    seller_msg = Message(to=seller)
+                    seller_msg.metadata = _ACCEPT_OFFER
+                    seller_msg.body = dumps(
+                        {
+                            "round_id": R,
+                            "buyer": "external_grid",
+                            "kw": surplus_kwh,
+                            "price": agent.external_grid_buy_price,
+                        }
+                    )
+                    pending_msgs.append(seller_msg)
+
+                    agent.ext_grid_total_bought_kwh += surplus_kwh
+                    agent.ext_grid_costs += total_revenue
+                    ext_bought_total += surplus_kwh
+                    ext_bought_value += total_revenue
+                    wasted_energy -= surplus_kwh
+
+                if ext_sold_total > 0 or ext_bought_total > 0:
+                    log.info("\n🌐 [External Grid Summary]")
+                    if ext_sold_total > 0:
+                        log.info(
+                            "    Sold to microgrid: %.1f kWh @ €%.2f/kWh = €%.2f",
+                            ext_sold_total,
+                            agent.external_grid_sell_price,
+                            ext_sold_value,
+                        )
+                    if ext_bought_total > 0:
+                        log.info(
+                            "    Bought from microgrid: %.1f kWh @ €%.2f/kWh = "
+                            "€%.2f",
+                            ext_bought_total,
+                            agent.external_grid_buy_price,
+                            ext_bought_value,
+                        )
+
+            else:
+                agent.ext_grid_rounds_unavailable += 1
+
+                if len(unmet_demand) > 0 or len(surplus_energy) > 0:
+                    log.info("\n🚫 EXTERNAL GRID UNAVAILABLE:\n")
+        
+                    if len(surplus_energy) > 0:
+                        log.info("⚡️ Wasted surplus (curtailed):")
+                        for seller, surplus_kwh in surplus_energy.items():
+                            log.info(" %s: %.1f kWh not sold", seller, surplus_kwh)
+
+        agent._add_events_batch(round_events)
+
+        flush_log()
+        if pending_msgs:
+            await BatchSender(self).send_messages(pending_msgs)
+
+        self._finalize_round(
+            num_reqs=num_reqs,
+            declined=declined,
+            buyer_fulfillment=buyer_fulfillment,
+            total_demand=total_demand,
+            total_traded=total_traded,
+            total_value=total_value,
+            avg_price_paid=avg_price_paid,
+            matched_count=matched_count,
+            partial_count=partial_count,
+            unmatched_count=unmatched_count,
+            ext_sold_total=ext_sold_total,
+            ext_sold_value=ext_sold_value,
+            ext_bought_total=ext_bought_total,
+            ext_bought_value=ext_bought_value,
+            wasted_energy=wasted_energy,
+        )
+
+        # Advance simulated time
+        agent.round_counter += 1
+
+        agent.sim_total_hour += 1
+        agent.sim_day, agent.sim_hour = divmod(agent.sim_total_hour, 24)
+
+        # Request next environment update. A new Message is sent every round
+        # (SPADE keeps sent messages in its traces and may hand them to local
+        # recipients as-is); only the read-only metadata dict is shared
+        update_msg = Message(
+            to=agent.env_jid,
+            body=_ENV_UPDATE_BODY % agent.sim_hour,
+            metadata=_ENV_UPDATE_META,
+        )
+        await self.send(update_msg)
+
+        # Single pause between rounds; skipped entirely when configured as 0
+        round_sleep = self._round_sleep
+        if round_sleep > 0:
+            await asyncio.sleep(round_sleep)
+
+    def _finalize_round(
+        self,
+        num_reqs,
+        declined,
+        buyer_fulfillment,
+        total_demand,
+        total_traded,
+        total_value,
+        avg_price_paid,
+        matched_count,
+        partial_count,
+        unmatched_count,
+        ext_sold_total,
+        ext_sold_value,
+        ext_bought_total,
+        ext_bought_value,
+        wasted_energy,
+    ):
+        """
+        Aggregate the settled round, print its summary and record metrics.
+
+        Kept synchronous so run() only holds the awaits of the round.
+
+        Args:
+            num_reqs (int): Number of energy requests in this round.
+            declined (set): Agents that declined the call for proposals.
+            buyer_fulfillment (dict[str, float]): Fulfillment % per buyer.
+            total_demand (float): Total requested energy (kWh).
+            total_traded (float): Energy traded inside the microgrid (kWh).
+            total_value (float): Value of the internal trades (€).
+            avg_price_paid (float): Mean of the buyers' average prices.
+            matched_count (int): Buyers fully matched.
+            partial_count (int): Buyers partially matched.
+            unmatched_count (int): Buyers left without energy.
+            ext_sold_total (float): Energy imported from the external grid.
+            ext_sold_value (float): Cost of the imported energy.
+            ext_bought_total (float): Energy exported to the external grid.
+            ext_bought_value (float): Revenue of the exported energy.
+            wasted_energy (float): Curtailed surplus (kWh).
+
+        Returns:
+            dict | None: The recorded round data, or None when the tracker
+            only updated its totals for this round.
+        """
+        agent = self.agent
+
+        # Average fulfillment and buyers hit by a blackout, vectorized
+        fulfillment_pct = np.fromiter(
+            buyer_fulfillment.values(), dtype=np.float64, count=len(buyer_fulfillment)
+        )
+        blackout_mask = fulfillment_pct < 99.0
+        blackout_impacted = int(blackout_mask.sum())
+        avg_fulfillment = (
+            float(fulfillment_pct.mean()) if fulfillment_pct.size else 0.0
+        )
+        blackout_pairs = []
+        if blackout_impacted:
+            buyer_jids = list(buyer_fulfillment)
+            blackout_pairs = [
+                (buyer_jids[i], buyer_fulfillment[buyer_jids[i]])
+                for i in np.flatnonzero(blackout_mask).tolist()
+            ]
+        blackout_round = blackout_impacted > 0
+
+        if log.isEnabledFor(logging.INFO):
+            if blackout_pairs:
+                # JIDs are unique, so ordering by JID alone is enough
+                blackout_pairs.sort(key=itemgetter(0))
+                log.info(
+                    "\n🚨 Blackout impact:" + _BLACKOUT_LINE * len(blackout_pairs),
+                    *(value for pair in blackout_pairs for value in pair),
                 )
-                if reqs
-                else 0,
+            else:
+                log.info("\n✅ No blackout impact this round.")
+
+        self._print_auction_results_summary(
+            total_buyers=num_reqs,
+            matched_count=matched_count,
+            partial_count=partial_count,
+            unmatched_count=unmatched_count,
+            declined_count=len(declined),
+            total_traded=total_traded,
+            total_value=total_value,
+            avg_price_paid=avg_price_paid,
+            ext_sold_total=ext_sold_total,
+            ext_sold_value=ext_sold_value,
+            ext_bought_total=ext_bought_total,
+            ext_bought_value=ext_bought_value,
+            wasted_energy=wasted_energy,
+            blackout_happened=blackout_round,
+            blackout_impacted=blackout_impacted,
+            round_sleep=self._round_sleep,
+        )
+
+        # Record round (PerformanceTracker may print a report every N rounds)
+        flush_log()
+        tracker = agent.performance_tracker
+        if tracker.wants_round(agent.round_counter):
+            round_data = {
+                "total_demand": total_demand,
                 "total_supplied": total_traded + ext_sold_total,
                 "market_value": total_value + ext_sold_value,
                 "wasted_energy": max(0.0, wasted_energy),
                 "ext_grid_sold": ext_sold_total,
                 "ext_grid_bought": ext_bought_total,
-                "buyer_fulfillment": buyer_fulfillment.copy(),
-                "any_producer_failed": self.agent.any_producer_failed,
-                "emergency_used": self.agent.any_producer_failed,
+                # Built fresh every round and never modified after this point
+                "buyer_fulfillment": buyer_fulfillment,
+                "any_producer_failed": agent.any_producer_failed,
+                "emergency_used": agent.any_producer_failed,
                 # Monetary values for external grid transactions
                 "ext_grid_sold_value": ext_bought_value,
                 "ext_grid_bought_value": ext_sold_value,
@@ -741,77 +1026,33 @@ class RoundOrchestrator(OneShotBehaviour):
                 "blackout": blackout_round,
                 "blackout_impacted": blackout_impacted,
             }
-
-            round_sleep = self.agent.config["SIMULATION"]["ROUND_SLEEP_SECONDS"]
-            post_env_sleep = round_sleep * 0.2
-            pre_env_sleep = max(0.0, round_sleep - post_env_sleep)
-
-            blackout_details = {
-                agent: pct
-                for agent, pct in buyer_fulfillment.items()
-                if pct < 99.0
-            }
-            if blackout_details:
-                print("\n🚨 Blackout impact:")
-                for agent, pct in sorted(blackout_details.items()):
-                    print(f"   {agent}: {pct:.0f}% fulfilled")
-            else:
-                print("\n✅ No blackout impact this round.")
-
-            self._print_auction_results_summary(
-                total_buyers=len(reqs),
-                matched_count=matched_count,
-                partial_count=partial_count,
-                unmatched_count=unmatched_count,
-                declined_count=len(declined),
-                total_traded=total_traded,
-                total_value=total_value,
-                prices_paid=prices_paid,
-                ext_sold_total=ext_sold_total,
-                ext_sold_value=ext_sold_value,
-                ext_bought_total=ext_bought_total,
-                ext_bought_value=ext_bought_value,
-                wasted_energy=wasted_energy,
-                blackout_happened=blackout_round,
-                blackout_impacted=blackout_impacted,
-                round_sleep=round_sleep,
-            )
-
-            # Record round (PerformanceTracker may print a report every N rounds)
-            self.agent.performance_tracker.record_round(
-                self.agent.round_counter, round_data
+            tracker.record_round(agent.round_counter, round_data)
+        else:
+            round_data = None
+            tracker.record_totals(
+                total_demand,
+                total_traded + ext_sold_total,
+                total_value + ext_sold_value,
+                ext_sold_total,
+                ext_bought_total,
+                ext_bought_value,
+                ext_sold_value,
+                blackout_round,
+                agent.any_producer_failed,
+                agent.any_producer_failed,
             )
 
-            # Log recoveries if any failure counters reached zero
-            for p_jid, state in self.agent.producers_state.items():
-                if not state.get("is_operational", True):
-                    if state.get("failure_rounds_remaining", 0) == 0:
-                        print(f"\n✅ {p_jid} recovered.\n")
+        agent._prune_round_history()
 
-            if pre_env_sleep > 0:
-                await asyncio.sleep(pre_env_sleep)
+        # Log recoveries if any failure counters reached zero
+        for p_jid in agent.failed_producers:
+            state = agent.producers_state[p_jid]
+            if state.get("failure_rounds_remaining", 0) == 0:
+                log.info("\n✅ %s recovered.\n", p_jid)
 
-            # Advance simulated time
-            self.agent.round_counter += 1
-
-            self.agent.sim_hour += 1
-            if self.agent.sim_hour >= 24:
-                self.agent.sim_hour = 0
-                self.agent.sim_day += 1
-
-            # Request next environment update
-            update_msg = Message(to=self.agent.env_jid)
-            update_msg.metadata = {
-                "performative": "request",
-                "type": "request_environment_update",
-            }
-            update_msg.body = json.dumps(
-                {"command": "update", "sim_hour": self.agent.sim_hour}
-            )
-            await self.send(update_msg)
+        flush_log()
 
-            if post_env_sleep > 0:
-                await asyncio.sleep(post_env_sleep)
+        return round_data
 
     def _print_auction_results_summary(
         self,
@@ -822,7 +1063,7 @@ class RoundOrchestrator(OneShotBehaviour):
         declined_count,
         total_traded,
         total_value,
-        prices_paid,
+        avg_price_paid,
         ext_sold_total,
         ext_sold_value,
         ext_bought_total,
@@ -835,56 +1076,70 @@ class RoundOrchestrator(OneShotBehaviour):
         """
         Print a concise auction summary at the end of each round.
         """
-        print("\n📊 AUCTION RESULTS:")
-        print(f"   🛒 Buyers requesting energy: {total_buyers}")
+        if not log.isEnabledFor(logging.INFO):
+            return
+
+        # Lines and their arguments are collected and logged as one record
+        lines = ["\n📊 AUCTION RESULTS:", "   🛒 Buyers requesting energy: %s"]
+        args = [total_buyers]
         if matched_count > 0:
-            print(f"   ✅ Fully matched: {matched_count}")
+            lines.append("   ✅ Fully matched: %s")
+            args.append(matched_count)
         if partial_count > 0:
-            print(f"   ⚠️ Partial matches: {partial_count}")
+            lines.append("   ⚠️ Partial matches: %s")
+            args.append(partial_count)
         if unmatched_count > 0:
-            print(f"   🚨 Unmatched requests: {unmatched_count}")
+            lines.append("   🚨 Unmatched requests: %s")
+            args.append(unmatched_count)
         if declined_count > 0:
-            print(f"   🚫 Sellers declined: {declined_count}")
+            lines.append("   🚫 Sellers declined: %s")
+            args.append(declined_count)
         if total_traded > 0:
-            print(f"   ⚡ Energy traded: {total_traded:.1f} kWh")
-            print(f"   💰 Market value: €{total_value:.2f}")
-            avg_price = sum(prices_paid) / len(prices_paid) if prices_paid else 0
-            print(f"   📈 Avg price: €{avg_price:.2f}/kWh")
+            lines.append("   ⚡ Energy traded: %.1f kWh")
+            lines.append("   💰 Market value: €%.2f")
+            lines.append("   📈 Avg price: €%.2f/kWh")
+            args.extend((total_traded, total_value, avg_price_paid))
         if ext_sold_total > 0 or ext_bought_total > 0:
-            print("   🌐 External grid market value:")
+            lines.append("   🌐 External grid market value:")
             if ext_sold_total > 0:
-                print(
-                    f"      Import (grid → buyers): {ext_sold_total:.1f} kWh cost €{ext_sold_value:.2f}"
-                )
+                lines.append("      Import (grid → buyers): %.1f kWh cost €%.2f")
+                args.extend((ext_sold_total, ext_sold_value))
             if ext_bought_total > 0:
-                print(
-                    f"      Export (microgrid → grid): {ext_bought_total:.1f} kWh revenue €{ext_bought_value:.2f}"
-                )
+                lines.append("      Export (microgrid → grid): %.1f kWh revenue €%.2f")
+                args.extend((ext_bought_total, ext_bought_value))
         if wasted_energy > 0:
-            print(f"   ♻️ Wasted energy: {wasted_energy:.1f} kWh")
+            lines.append("   ♻️ Wasted energy: %.1f kWh")
+            args.append(wasted_energy)
         if blackout_happened:
-            print(f"   🚨 Blackout: YES ({blackout_impacted} agent(s) affected)")
+            lines.append("   🚨 Blackout: YES (%s agent(s) affected)")
+            args.append(blackout_impacted)
         else:
-            print("   ✅ Blackout: NO")
+            lines.append("   ✅ Blackout: NO")
+        log.info("\n".join(lines), *args)
 
 
     def _format_energy_state(self, agent_jid):
         """
         Return a string with extra energy state info for unmet demand logs.
         """
-        state = self.agent.storage_state.get(agent_jid)
-        if state:
+        kind = self.agent.agent_kind.get(agent_jid)
+        if kind == "storage":
+            state = self.agent.storage_state.get(agent_jid)
+            if not state:
+                return ""
             soc = state.get("soc_kwh", 0.0)
             cap = state.get("cap_kwh", 0.0)
             pct = (soc / cap * 100) if cap > 0 else 0.0
             return f" | SOC {pct:.0f}%"
 
-        household_state = self.agent.households_state.get(agent_jid)
-        if household_state and household_state.get("is_prosumer", False):
+        if kind == "prosumer":
+            household_state = self.agent.households_state.get(agent_jid)
+            if not household_state:
+                return ""
             battery_kwh = household_state.get("battery_kwh", 0.0)
-            cap = self.agent.config["HOUSEHOLDS"]["BATTERY_CAPACITY_KWH"]
+            cap = self._battery_cap
             pct = (battery_kwh / cap * 100) if cap > 0 else 0.0
-            pct = max(0.0, min(100.0, pct))
+            pct = 0.0 if pct < 0.0 else (100.0 if pct > 100.0 else pct)
             return f" | Battery {pct:.0f}%"
 
         return ""
@@ -893,10 +1148,4 @@ class RoundOrchestrator(OneShotBehaviour):
         """
         Map the current hour to an emoji representing the demand period.
         """
-        if 6 <= hour < 9:
-            return "🌅"
-        if 9 <= hour < 18:
-            return "☀️"
-        if 18 <= hour < 22:
-            return "🌆"
-        return "🌙"
+        return _HOUR_EMOJI[hour]
@@ -1,4 +1,19 @@
 from spade.behaviour import OneShotBehaviour
+import sys
+from agents.grid_node.market_totals import storage_contribution
+
+# Summary table, written to stdout in a single call. The bracketed
+# counts/status are left-aligned in fixed-width fields to keep the box edge.
+_TABLE = "\n".join([
+    "╔" + "=" * 58 + "╗",
+    "║" + " " * 10 + "GRID ENERGY MARKET - ROUND SUMMARY" + " " * 14 + "║",
+    "╠" + "=" * 58 + "╣",
+    "║  Total Demand:     {:7.1f} kWh  {:<23}║",
+    "║  Total Available:  {:7.1f} kWh  {:<22}║",
+    "║  Market Balance:   {:+7.1f} kWh {:<23}║",
+    "╚" + "=" * 58 + "╝\n",
+    "",
+])
 
 class PrintTotalsTable(OneShotBehaviour):
     """
@@ -19,87 +34,42 @@ class PrintTotalsTable(OneShotBehaviour):
 
     async def run(self):
         """
-        Compute and print the total demand, total available energy,
-        number of buyers and sellers, and market balance.
-        """
-        total_demand = 0.0
-        total_available = 0.0
-        num_buyers = 0
-        num_sellers = 0
-
-        # Households
-        for state in self.agent.households_state.values():
-            demand = state.get("demand_kwh", 0)
-            prod = state.get("prod_kwh", 0)
-            if demand > prod:
-                total_demand += (demand - prod)
-                num_buyers += 1
-            elif prod > demand:
-                total_available += (prod - demand)
-                num_sellers += 1
+        Print the total demand, total available energy, number of
+        buyers and sellers, and market balance.
 
-        # Producers
-        for state in self.agent.producers_state.values():
-            prod = state.get("prod_kwh", 0)
-            if prod > 0 and state.get("is_operational", True):
-                total_available += prod
-                num_sellers += 1
-
-        # Storage
-        for state in self.agent.storage_state.values():
-            soc = state.get("soc_kwh", 0)
-            cap = state.get("cap_kwh", 1)
-            soc_pct = (soc / cap * 100) if cap > 0 else 0
-            emergency_only = state.get("emergency_only", False)
+        Totals are kept current by the Receiver as reports arrive; only
+        emergency-only storage units are evaluated here.
+        """
+        with self.agent.prof.section("print_totals"):
+            totals = self.agent.market_totals
+            total_demand = totals.total_demand
+            total_available = totals.total_available
+            num_buyers = totals.num_buyers
+            num_sellers = totals.num_sellers
 
-            if emergency_only:
-                if self.agent.any_producer_failed and soc_pct > 20.0:
-                    avail = soc - 0.2 * cap
-                    if avail > 0:
-                        total_available += avail
-                        num_sellers += 1
-                elif soc_pct < 99.0 and not self.agent.any_producer_failed:
-                    need = cap - soc
-                    if need > 0.5:
-                        total_demand += need
-                        num_buyers += 1
-            else:
-                if soc_pct >= 95.0:
-                    avail = soc - 0.2 * cap
-                    if avail > 0:
-                        total_available += avail
-                        num_sellers += 1
-                else:
-                    need = cap - soc
-                    if need > 0:
-                        total_demand += need
-                        num_buyers += 1
+            # Emergency-only storage depends on the current failure flag
+            any_failed = self.agent.any_producer_failed
+            storage_state = self.agent.storage_state
+            for jid in self.agent.emergency_storage_jids:
+                need, avail = storage_contribution(storage_state[jid], any_failed)
+                if need > 0:
+                    total_demand += need
+                    num_buyers += 1
+                if avail > 0:
+                    total_available += avail
+                    num_sellers += 1
 
-        balance = total_available - total_demand
-        status = "surplus" if balance >= 0 else "deficit"
+            balance = total_available - total_demand
+            status = "surplus" if balance >= 0 else "deficit"
 
-        print("╔" + "=" * 58 + "╗")
-        print(
-            "║"
-            + " " * 10
-            + "GRID ENERGY MARKET - ROUND SUMMARY"
-            + " " * 14
-            + "║"
-        )
-        print("╠" + "=" * 58 + "╣")
-        print(
-            f"║  Total Demand:     {total_demand:7.1f} kWh  ({num_buyers} buyers)"
-            + " " * (58 - 44 - len(str(num_buyers)))
-            + "║"
-        )
-        print(
-            f"║  Total Available:  {total_available:7.1f} kWh  ({num_sellers} sellers)"
-            + " " * (58 - 46 - len(str(num_sellers)))
-            + "║"
-        )
-        print(
-            f"║  Market Balance:   {balance:+7.1f} kWh ({status})"
-            + " " * (58 - 37 - len(status))
-            + "║"
-        )
-        print("╚" + "=" * 58 + "╝\n")
+            sys.stdout.write(
+                _TABLE.format(
+                    total_demand,
+                    f"({num_buyers} buyers)",
+                    total_available,
+                    f"({num_sellers} sellers)",
+                    balance,
+                    f"({status})",
+                )
+            )
+            sys.stdout.flush()
@@ -0,0 +1,80 @@
+from contextlib import nullcontext
+import time
+
+
+class _Section:
+    """Context manager that adds its elapsed time to one profiler entry."""
+
+    __slots__ = ("stats", "name", "start")
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        entry = self.stats.get(self.name)
+        if entry is None:
+            self.stats[self.name] = [1, elapsed, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+            if elapsed > entry[2]:
+                entry[2] = elapsed
+        return False
+
+
+class SectionProfiler:
+    """
+    Minimal wall-clock profiler for named sections of the GridNode behaviours.
+
+    Each section keeps a call count, the total time and the slowest call.
+    When disabled, ``section`` returns a shared no-op context manager, so
+    instrumented code costs next to nothing in normal runs.
+
+    Args:
+        enabled (bool): Whether timings are recorded.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stats = {}
+        self._noop = nullcontext()
+
+    def section(self, name):
+        """
+        Time the body of a ``with`` block under the given name.
+
+        Args:
+            name (str): Section name (e.g. a message type or behaviour).
+
+        Returns:
+            contextlib.AbstractContextManager: The timing context.
+        """
+        if not self.enabled:
+            return self._noop
+        return _Section(self.stats, name)
+
+    def print_report(self):
+        """
+        Print the recorded sections, slowest total first.
+        """
+        if not self.stats:
+            return
+
+        print("\n" + "━" * 80)
+        print("  ⏱️  GRID NODE PROFILE")
+        print("━" * 80)
+        print(f"  {'Section':<28}{'Calls':>10}{'Total ms':>14}{'Mean ms':>12}{'Max ms':>12}")
+        rows = sorted(self.stats.items(), key=lambda item: item[1][1], reverse=True)
+        for name, (calls, total, slowest) in rows:
+            print(
+                f"  {name:<28}{calls:>10}{total * 1000:>14.1f}"
+                f"{total * 1000 / calls:>12.3f}{slowest * 1000:>12.3f}"
+            )
+        print("━" * 80 + "\n")
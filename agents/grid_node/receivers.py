@@ -1,6 +1,48 @@
 from spade.behaviour import CyclicBehaviour
-import json
+from collections import namedtuple
+import math
 import time
+from agents.messaging import loads
+from agents.grid_node.round_log import flush_log
+from agents.grid_node.market_totals import (
+    household_contribution,
+    producer_contribution,
+    storage_contribution,
+    storage_soc,
+)
+
+# Per-round records kept in offers_round / requests_round
+Offer = namedtuple("Offer", "offer_kwh price ts")
+Request = namedtuple("Request", "need_kwh price_max")
+
+# How long one Receiver tick waits for the first message
+RECEIVE_TIMEOUT_S = 1.0
+# Messages handled per tick before yielding back to the other behaviours
+RECEIVE_DRAIN_LIMIT = 256
+
+# Fields the status printers read; stored states are backfilled with these
+# so the per-round loops can index them directly
+HOUSEHOLD_DEFAULTS = {
+    "demand_kwh": 0.0,
+    "prod_kwh": 0.0,
+    "is_prosumer": False,
+    "solar_irradiance": 0.0,
+    "panel_area_m2": 0.0,
+}
+PRODUCER_DEFAULTS = {
+    "prod_kwh": 0.0,
+    "type": "unknown",
+    "solar_irradiance": 0.0,
+    "wind_speed": 0.0,
+    "is_operational": True,
+    "failure_rounds_remaining": 0,
+    "failure_rounds_total": 0,
+}
+STORAGE_DEFAULTS = {
+    "soc_kwh": 0.0,
+    "cap_kwh": 1.0,
+    "emergency_only": False,
+}
 
 class Receiver(CyclicBehaviour):
     """
@@ -15,155 +57,236 @@ class Receiver(CyclicBehaviour):
 
     async def run(self):
         """
-        Receive a single message (if available) and process it
-        according to its type.
+        Wait for a message, then process it and every message already
+        queued behind it (up to RECEIVE_DRAIN_LIMIT), each according to
+        its type.
         """
-        msg = await self.receive(timeout=0.5)
-        if not msg:
-            return
+        msg = await self.receive(timeout=RECEIVE_TIMEOUT_S)
+        handlers = self._HANDLERS
+        section = self.agent.prof.section
+        drained = 0
+        while msg is not None:
+            msg_type = msg.metadata.get("type", "")
+            handler = handlers.get(msg_type)
+            if handler is not None:
+                with section(msg_type):
+                    handler(self, str(msg.sender).split("/")[0], msg)
 
-        sender = str(msg.sender).split("/")[0]
-        msg_type = msg.metadata.get("type", "")
+            drained += 1
+            if drained >= RECEIVE_DRAIN_LIMIT:
+                break
+            # Without a timeout receive() only takes what is already queued
+            msg = await self.receive()
 
-        if msg_type == "register_household":
-            self.agent.known_households.add(sender)
-            self.agent._add_event("register", sender, {"type": "household"})
-            return
+    def _on_register_household(self, sender, msg):
+        """Register a household and record whether it is a prosumer."""
+        self.agent.known_households.add(sender)
+        self.agent.known_version += 1
+        data = loads(msg.body)
+        self.agent.agent_kind[sender] = (
+            "prosumer" if data.get("is_prosumer", False) else "plain"
+        )
+        self.agent._add_event("register", sender, {"type": "household"})
+        self.agent._note_registration()
 
-        if msg_type == "register_producer":
-            self.agent.known_producers.add(sender)
-            self.agent._add_event("register", sender, {"type": "producer"})
-            return
+    def _on_register_producer(self, sender, msg):
+        """Register a producer."""
+        self.agent.known_producers.add(sender)
+        self.agent.known_version += 1
+        self.agent._add_event("register", sender, {"type": "producer"})
+        self.agent._note_registration()
 
-        if msg_type == "register_storage":
-            self.agent.known_storage.add(sender)
-            self.agent._add_event("register", sender, {"type": "storage"})
-            return
+    def _on_register_storage(self, sender, msg):
+        """Register a storage unit."""
+        self.agent.known_storage.add(sender)
+        self.agent.known_version += 1
+        self.agent.agent_kind[sender] = "storage"
+        self.agent._add_event("register", sender, {"type": "storage"})
+        self.agent._note_registration()
 
-        if msg_type == "status_report":
-            data = json.loads(msg.body)
-            self.agent.households_state[sender] = data
-            R = self.agent.round_id
-            if R:
-                self.agent.status_seen_round[R].add(sender)
-            self.agent._add_event("status", sender, data)
-            self.agent.current_solar = data.get("solar_irradiance", self.agent.current_solar)
-            self.agent.current_wind = data.get("wind_speed", self.agent.current_wind)
-            self.agent.current_temp = data.get("temperature_c", self.agent.current_temp)
-            return
+    def _on_status_report(self, sender, msg):
+        """Store a household status report."""
+        data = loads(msg.body)
+        state = {**HOUSEHOLD_DEFAULTS, **data}
+        if sender not in self.agent.households_state:
+            if state["is_prosumer"]:
+                self.agent.prosumer_jids.append(sender)
+            else:
+                self.agent.consumer_jids.append(sender)
+        self.agent.households_state[sender] = state
+        self.agent.household_arrays.update(sender, state)
+        self.agent.market_totals.update(sender, *household_contribution(state))
+        R = self.agent.round_id
+        if R:
+            self._mark_status_seen(R, sender)
+        self.agent._add_event("status", sender, data)
+        self.agent._note_initial_report()
+        self.agent.current_solar = data.get("solar_irradiance", self.agent.current_solar)
+        self.agent.current_wind = data.get("wind_speed", self.agent.current_wind)
+        self.agent.current_temp = data.get("temperature_c", self.agent.current_temp)
 
-        if msg_type == "production_report":
-            data = json.loads(msg.body)
-
-            # Preserve failure state controlled by the GridNode
-            if sender in self.agent.producers_state:
-                existing_state = self.agent.producers_state[sender]
-
-                # If the GridNode marked this producer as offline, keep it offline
-                if not existing_state.get("is_operational", True):
-                    remaining = existing_state.get("failure_rounds_remaining", 0)
-                    if remaining > 0:
-                        remaining -= 1
-                        existing_state["failure_rounds_remaining"] = remaining
-
-                        if remaining == 0:
-                            existing_state["is_operational"] = True
-                            data["is_operational"] = True
-                            data["failure_rounds_remaining"] = 0
-                            print(f"\n✅ {sender} recovered after failure.\n")
-                        else:
-                            data["is_operational"] = False
-                            data["failure_rounds_remaining"] = remaining
-                            data["failure_rounds_total"] = existing_state.get(
-                                "failure_rounds_total", 0
-                            )
-                            data["prod_kwh"] = 0.0
-                    else:
+    def _on_production_report(self, sender, msg):
+        """Store a producer report, preserving failures set by the GridNode."""
+        data = loads(msg.body)
+
+        # Preserve failure state controlled by the GridNode
+        if sender in self.agent.producers_state:
+            existing_state = self.agent.producers_state[sender]
+
+            # If the GridNode marked this producer as offline, keep it offline
+            if not existing_state.get("is_operational", True):
+                remaining = existing_state.get("failure_rounds_remaining", 0)
+                if remaining > 0:
+                    remaining -= 1
+                    existing_state["failure_rounds_remaining"] = remaining
+
+                    if remaining == 0:
                         existing_state["is_operational"] = True
                         data["is_operational"] = True
+                        data["failure_rounds_remaining"] = 0
+                        # Keep the message in order with the batched round log
+                        flush_log()
+                        print(f"\n✅ {sender} recovered after failure.\n")
+                    else:
+                        data["is_operational"] = False
+                        data["failure_rounds_remaining"] = remaining
+                        data["failure_rounds_total"] = existing_state.get(
+                            "failure_rounds_total", 0
+                        )
+                        data["prod_kwh"] = 0.0
+                else:
+                    existing_state["is_operational"] = True
+                    data["is_operational"] = True
+
+        state = {**PRODUCER_DEFAULTS, **data}
+        self.agent.producers_state[sender] = state
+        self.agent.producer_arrays.update(sender, state)
+        self.agent.market_totals.update(sender, *producer_contribution(state))
 
-            self.agent.producers_state[sender] = data
-
-            # Update any_producer_failed flag based on all producers
-            self.agent.any_producer_failed = False
-            for _, state in self.agent.producers_state.items():
-                if not state.get("is_operational", True):
-                    self.agent.any_producer_failed = True
-                    break
-
-            R = self.agent.round_id
-            if R:
-                self.agent.status_seen_round[R].add(sender)
-            self.agent._add_event("production", sender, data)
-            self.agent.current_solar = data.get("solar_irradiance", self.agent.current_solar)
-            self.agent.current_wind = data.get("wind_speed", self.agent.current_wind)
-            self.agent.current_temp = data.get("temperature_c", self.agent.current_temp)
+        # Track offline producers so the failure flag needs no full scan
+        if state["is_operational"]:
+            self.agent.failed_producers.discard(sender)
+        else:
+            self.agent.failed_producers.add(sender)
+        self.agent.any_producer_failed = bool(self.agent.failed_producers)
+
+        R = self.agent.round_id
+        if R:
+            self._mark_status_seen(R, sender)
+        self.agent._add_event("production", sender, data)
+        self.agent._note_initial_report()
+        self.agent.current_solar = data.get("solar_irradiance", self.agent.current_solar)
+        self.agent.current_wind = data.get("wind_speed", self.agent.current_wind)
+        self.agent.current_temp = data.get("temperature_c", self.agent.current_temp)
+
+    def _on_status_battery(self, sender, msg):
+        """Store a storage status report."""
+        data = loads(msg.body)
+        state = {**STORAGE_DEFAULTS, **data}
+        self.agent.storage_state[sender] = state
+        self.agent.storage_levels[sender] = storage_soc(state)
+        emergency = self.agent.emergency_storage_jids
+        if bool(state["emergency_only"]) != (sender in emergency):
+            self.agent.emergency_storage_jids = emergency ^ {sender}
+        if state["emergency_only"]:
+            # Depends on the failure flag, so PrintTotalsTable adds it
+            self.agent.market_totals.update(sender, 0.0, 0.0)
+        else:
+            self.agent.market_totals.update(
+                sender, *storage_contribution(state, False)
+            )
+        R = self.agent.round_id
+        if R:
+            self._mark_status_seen(R, sender)
+        self.agent._add_event("battery_status", sender, data)
+        self.agent._note_initial_report()
+
+    def _on_energy_request(self, sender, msg):
+        """Record an energy request for the current round."""
+        R = self.agent.round_id
+        if not R:
+            # No round is open, so the request is stale whatever it contains
+            return
+        data = loads(msg.body)
+        if data.get("round_id") != R:
             return
+        buyer = sender
+        need_kwh = max(0.0, float(data.get("need_kwh", 0)))
+        price_max = float(data.get("price_max", 0))
 
-        if msg_type == "statusBattery":
-            data = json.loads(msg.body)
-            self.agent.storage_state[sender] = data
-            R = self.agent.round_id
-            if R:
-                self.agent.status_seen_round[R].add(sender)
-            self.agent._add_event("battery_status", sender, data)
+        # NaN/Infinity would end up in the hand-built accept bodies
+        if need_kwh <= 0.0 or not math.isfinite(need_kwh + price_max):
             return
 
-        if msg_type == "energy_request":
-            data = json.loads(msg.body)
-            R = self.agent.round_id
-            if data.get("round_id") != R:
-                return
-            buyer = sender
-            need_kwh = max(0.0, float(data.get("need_kwh", 0)))
-            price_max = float(data.get("price_max", 0))
-
-            if need_kwh <= 0.0:
-                return
-
-            self.agent.requests_round[R][buyer] = {
-                "need_kwh": need_kwh,
-                "price_max": price_max,
-            }
-            self.agent._add_event("request", buyer, need_kwh, price_max, R)
+        self.agent.requests_round[R][buyer] = Request(need_kwh, price_max)
+        self.agent._add_event("request", buyer, need_kwh, price_max, R)
+        self.agent._note_cfp_response(R, sender)
+
+    def _on_energy_offer(self, sender, msg):
+        """Record an energy offer, or log it as late."""
+        # Offers from offline producers are dropped before parsing the body
+        if sender in self.agent.failed_producers:
             return
 
-        if msg_type == "energy_offer":
-            data = json.loads(msg.body)
-            rid = data.get("round_id")
-            seller = sender
-            offer = max(0.0, float(data.get("offer_kwh", 0)))
-            price = float(data.get("price", 0))
-            now = time.time()
-            R = self.agent.round_id
-
-            if sender in self.agent.producers_state:
-                producer_state = self.agent.producers_state[sender]
-                if not producer_state.get("is_operational", True):
-                    return
-
-            if offer <= 0.0:
-                return
-
-            if (
-                rid == R
-                and self.agent.round_deadline_ts > 0.0
-                and now <= self.agent.round_deadline_ts
-            ):
-                self.agent.offers_round[R][seller] = {
-                    "offer_kwh": offer,
-                    "price": price,
-                    "ts": now,
-                }
-                self.agent._add_event("offer", seller, offer, price, R)
-            else:
-                self.agent._add_event("late", seller, offer, price, rid)
+        data = loads(msg.body)
+        rid = data.get("round_id")
+        seller = sender
+        offer = max(0.0, float(data.get("offer_kwh", 0)))
+        price = float(data.get("price", 0))
+        now = time.time()
+        R = self.agent.round_id
+
+        if offer <= 0.0 or not math.isfinite(offer + price):
             return
 
-        if msg_type == "declined_offer":
-            data = json.loads(msg.body)
-            rid = data.get("round_id")
-            R = self.agent.round_id
-            if rid == R:
-                self.agent.declined_round[R].add(sender)
-                self.agent._add_event("declined", sender, {}, None, R)
+        if (
+            rid == R
+            and self.agent.round_deadline_mono > 0.0
+            and time.monotonic() <= self.agent.round_deadline_mono
+        ):
+            self.agent.offers_round[R][seller] = Offer(offer, price, now)
+            self.agent._add_event("offer", seller, offer, price, R)
+            self.agent._note_cfp_response(R, sender)
+        else:
+            self.agent._add_event("late", seller, offer, price, rid)
+
+    def _on_declined_offer(self, sender, msg):
+        """Record that an agent declined the current round."""
+        R = self.agent.round_id
+        if not R:
+            return
+        data = loads(msg.body)
+        if data.get("round_id") == R:
+            self.agent.declined_round[R].add(sender)
+            self.agent._add_event("declined", sender, {}, None, R)
+            self.agent._note_cfp_response(R, sender)
+
+    def _mark_status_seen(self, round_id, sender):
+        """
+        Record a status report for the round and signal the orchestrator
+        once every expected agent has reported.
+
+        Args:
+            round_id (float): Round the report belongs to.
+            sender (str): JID of the reporting agent.
+        """
+        seen = self.agent.status_seen_round[round_id]
+        seen.add(sender)
+        self.agent.status_any_event.set()
+
+        expected = self.agent.status_expected
+        if expected and len(seen) >= len(expected) and expected.issubset(seen):
+            self.agent.status_complete_event.set()
+
+    # Message type -> handler, looked up once per received message
+    _HANDLERS = {
+        "register_household": _on_register_household,
+        "register_producer": _on_register_producer,
+        "register_storage": _on_register_storage,
+        "status_report": _on_status_report,
+        "production_report": _on_production_report,
+        "statusBattery": _on_status_battery,
+        "energy_request": _on_energy_request,
+        "energy_offer": _on_energy_offer,
+        "declined_offer": _on_declined_offer,
+    }
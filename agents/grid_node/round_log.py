@@ -0,0 +1,47 @@
+from logging.handlers import MemoryHandler
+import logging
+import sys
+
+
+class _BatchedMemoryHandler(MemoryHandler):
+    """
+    MemoryHandler that writes its whole buffer to the target stream with a
+    single write() and flush(), instead of one of each per record.
+    """
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self.buffer and self.target is not None:
+                target = self.target
+                text = "".join(
+                    target.format(record) + target.terminator
+                    for record in self.buffer
+                )
+                target.stream.write(text)
+                target.flush()
+                self.buffer.clear()
+        finally:
+            self.release()
+
+
+# Round output is buffered and written once per phase instead of once per line
+log = logging.getLogger("orchestrator")
+log.setLevel(logging.INFO)
+log.propagate = False
+_stdout_handler = logging.StreamHandler(sys.stdout)
+_stdout_handler.setFormatter(logging.Formatter("%(message)s"))
+_log_buffer = _BatchedMemoryHandler(
+    capacity=4096, flushLevel=logging.WARNING, target=_stdout_handler
+)
+log.addHandler(_log_buffer)
+
+
+def flush_log():
+    """
+    Write any buffered orchestrator output to stdout.
+
+    Must be called before yielding to the event loop or calling code that
+    prints directly, so the console output keeps its original order.
+    """
+    _log_buffer.flush()
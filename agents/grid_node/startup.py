@@ -4,6 +4,9 @@ import asyncio
 import json
 from agents.grid_node.orchestrator import RoundOrchestrator
 
+# Upper bound on the wait for every agent's first status report
+INITIAL_REPORTS_TIMEOUT_S = 5.0
+
 
 class StartupCoordinator(OneShotBehaviour):
     """
@@ -17,19 +20,13 @@ class StartupCoordinator(OneShotBehaviour):
         are registered, then request the first environment update and
         start the round orchestrator.
         """
-        while True:
-            await asyncio.sleep(0.2)
-
-            got_h = len(self.agent.known_households)
-            got_p = len(self.agent.known_producers)
-            got_s = len(self.agent.known_storage)
+        # Also sets the event when no market agents are expected at all
+        self.agent._note_registration()
+        await self.agent.all_registered.wait()
 
-            exp_h = self.agent.expected_agents["households"]
-            exp_p = self.agent.expected_agents["producers"]
-            exp_s = self.agent.expected_agents["storage"]
-
-            if got_h >= exp_h and got_p >= exp_p and got_s >= exp_s:
-                break
+        got_h = len(self.agent.known_households)
+        got_p = len(self.agent.known_producers)
+        got_s = len(self.agent.known_storage)
 
         total_market_agents = got_h + got_p + got_s
         total_with_core = total_market_agents + 2  # grid node + environment agent
@@ -64,9 +61,18 @@ class StartupCoordinator(OneShotBehaviour):
         )
         await self.send(update_msg)
 
-        await asyncio.sleep(1.0)
         print("[GridNode] Waiting for initial status reports...\n")
-        await asyncio.sleep(0.5)
+        try:
+            await asyncio.wait_for(
+                self.agent.initial_reports_complete.wait(),
+                INITIAL_REPORTS_TIMEOUT_S,
+            )
+        except asyncio.TimeoutError:
+            print(
+                "[GridNode] Not every agent reported within "
+                f"{INITIAL_REPORTS_TIMEOUT_S:.0f}s, starting anyway.\n"
+            )
         print("[GridNode] Starting auction system...\n")
+
         self.agent.add_behaviour(RoundOrchestrator())
 
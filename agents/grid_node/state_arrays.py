@@ -0,0 +1,80 @@
+import numpy as np
+
+
+class StateArrays:
+    """
+    Struct-of-arrays mirror of the numeric fields of per-agent state dicts.
+
+    Every agent JID owns one row and every tracked field is a float64 column,
+    so a whole population can be classified with vectorized comparisons
+    instead of a Python loop over dicts. Columns grow by doubling.
+
+    Args:
+        defaults (dict[str, float]): Tracked field names and the value used
+            when a report does not include the field.
+        capacity (int): Initial number of rows.
+    """
+
+    def __init__(self, defaults, capacity=16):
+        self.defaults = dict(defaults)
+        self.index = {}
+        self.jids = []
+        self._capacity = max(1, int(capacity))
+        self._columns = {
+            name: np.zeros(self._capacity, dtype=np.float64) for name in self.defaults
+        }
+
+    def __len__(self):
+        return len(self.jids)
+
+    def update(self, jid, state):
+        """
+        Copy the tracked fields of an agent's latest state into its row.
+
+        Args:
+            jid (str): Agent JID.
+            state (dict): Latest state of the agent.
+        """
+        row = self.index.get(jid)
+        if row is None:
+            row = len(self.jids)
+            if row == self._capacity:
+                self._grow()
+            self.index[jid] = row
+            self.jids.append(jid)
+
+        for name, default in self.defaults.items():
+            self._columns[name][row] = state.get(name, default)
+
+    def column(self, name):
+        """
+        Return the filled part of a column (a view, not a copy).
+
+        Args:
+            name (str): Field name.
+
+        Returns:
+            numpy.ndarray: One value per known agent, in row order.
+        """
+        return self._columns[name][:len(self.jids)]
+
+    def select(self, mask):
+        """
+        Return the JIDs of the rows selected by a boolean mask.
+
+        Args:
+            mask (numpy.ndarray): Boolean array as long as the filled rows.
+
+        Returns:
+            list[str]: Selected JIDs, in row order.
+        """
+        jids = self.jids
+        return [jids[i] for i in np.flatnonzero(mask).tolist()]
+
+    def _grow(self):
+        """Double the capacity of every column."""
+        self._capacity *= 2
+        for name, column in self._columns.items():
+            grown = np.zeros(self._capacity, dtype=np.float64)
+            grown[:len(column)] = column
+            self._columns[name] = grown
@@ -1,17 +1,24 @@
 import time
 import random
+import asyncio
 import spade
+import numpy as np
 from collections import defaultdict
 from logs.db_logger import DBLogger
 from agents.performance_metrics import PerformanceTracker
 from scenarios.base_config import SCENARIO_CONFIG
 from agents.grid_node.receivers import Receiver
 from agents.grid_node.startup import StartupCoordinator
-from agents.grid_node.orchestrator import RoundOrchestrator
-from agents.grid_node.print_status import PrintAgentStatus
-from agents.grid_node.print_totals import PrintTotalsTable
-from agents.grid_node.invite_burst import InviteBurstSend
+from agents.grid_node.round_log import flush_log
+from agents.grid_node.state_arrays import StateArrays
+from agents.grid_node.profiler import SectionProfiler
+from agents.grid_node.market_totals import MarketTotals, producer_contribution
 
+# Number of past rounds kept in the per-round bookkeeping dicts
+MAX_ROUND_HISTORY = 50
+
+# External grid prices and availability are drawn this many rounds at a time
+EXT_GRID_DRAW_BATCH = 1024
 
 
 class GridNodeAgent(spade.agent.Agent):
@@ -47,6 +54,10 @@ class GridNodeAgent(spade.agent.Agent):
         self.config = config
         self.agent_limits_kw = self.config["SIMULATION"].get("AGENT_LIMITS_KW", {})
         self.transmission_limit_kw = self.config["SIMULATION"]["TRANSMISSION_LIMIT_KW"]
+        self.rng = random.Random(self.config["SIMULATION"].get("SEED"))
+        self.np_rng = np.random.default_rng(self.config["SIMULATION"].get("SEED"))
+        self._ext_grid_draws = None
+        self._ext_grid_cursor = 0
 
         if external_grid_config is None:
             external_grid_config = {
@@ -77,9 +88,12 @@ class GridNodeAgent(spade.agent.Agent):
         # Producer failure simulation
         self.producer_failure_probability = self.config["PRODUCERS"]["FAILURE_PROB"]
         self.any_producer_failed = False
+        self.failed_producers = set()
 
         # Performance tracking
         self.performance_tracker = PerformanceTracker()
+        # Per-section timings of the GridNode behaviours (METRICS.PROFILE)
+        self.prof = SectionProfiler(self.config["METRICS"].get("PROFILE", False))
 
     async def setup(self):
         """
@@ -91,22 +105,54 @@ class GridNodeAgent(spade.agent.Agent):
         """
         self.db_logger = DBLogger()
         self.households_state = {}
+        # Households split by type on their first status report, in arrival order
+        self.consumer_jids = []
+        self.prosumer_jids = []
         self.producers_state = {}
         self.storage_state = {}
+        # (soc_kwh, cap_kwh, soc_pct) per storage unit, computed on receipt
+        self.storage_levels = {}
+        # Storage units reporting emergency_only, kept current by the receiver
+        self.emergency_storage_jids = frozenset()
+        # Numeric mirrors of producers_state / households_state used to
+        # classify sellers and buyers with vectorized comparisons
+        self.producer_arrays = StateArrays({"prod_kwh": 0.0, "is_operational": 1.0})
+        self.household_arrays = StateArrays({"prod_kwh": 0.0, "demand_kwh": 0.0})
+        # Demand/supply totals for the round summary, updated on every report
+        # (emergency-only storage is added at print time, as it depends on
+        # the producer failure flag)
+        self.market_totals = MarketTotals()
         self.round_id = None
         self.round_phase = {}
         self.round_start_ts = 0.0
         self.round_deadline_ts = 0.0
+        self.round_deadline_mono = 0.0
         self.simulation_start_ts = time.time()
         self.known_households = set()
         self.known_producers = set()
         self.known_storage = set()
+        # Bumped on every registration so known_agents() can cache its union
+        self.known_version = 0
+        self._known_agents_cache = (-1, frozenset())
+        # Set once every expected agent has registered
+        self.all_registered = asyncio.Event()
+        # Set once every expected agent has sent its first status report
+        self.initial_reports_complete = asyncio.Event()
+        # "storage", "prosumer" or "plain", filled in at registration
+        self.agent_kind = {}
         self.status_seen_round = defaultdict(set)
         self.status_grace_s = 2.0
+        self.status_expected = set()
+        self.status_complete_event = asyncio.Event()
+        self.status_any_event = asyncio.Event()
         self.offers_round = defaultdict(dict)
         self.requests_round = defaultdict(dict)
         self.invited_round = defaultdict(set)
         self.declined_round = defaultdict(set)
+        # Agents sent this round's call for offers, and those that answered
+        self.cfp_recipients = frozenset()
+        self.cfp_responded = set()
+        self.offers_complete_event = asyncio.Event()
         self.auction_log = []
         self.totals_round = defaultdict(
             lambda: {"demand_kwh": 0.0, "available_kwh": 0.0}
@@ -116,6 +162,8 @@ class GridNodeAgent(spade.agent.Agent):
         )
         self.sim_hour = 1
         self.sim_day = 1
+        # Monotonic hour counter; divmod by 24 yields (sim_day, sim_hour)
+        self.sim_total_hour = self.sim_day * 24 + self.sim_hour
         self.round_counter = 1
         self.current_solar = 0.0
         self.current_wind = 0.0
@@ -146,6 +194,154 @@ class GridNodeAgent(spade.agent.Agent):
         }
         self.auction_log.append(evt)
 
+    def _add_events_batch(self, events):
+        """
+        Append several events to the auction log at once.
+
+        All events share a single timestamp taken when the batch is logged.
+
+        Args:
+            events (list[tuple]): (event_type, agent_jid, data, price,
+                round_id) tuples, in the order they occurred.
+        """
+        ts = time.time()
+        self.auction_log.extend(
+            {
+                "ts": ts,
+                "event": event_type,
+                "agent": str(agent_jid),
+                "data": data,
+                "price": price,
+                "round_id": round_id,
+            }
+            for event_type, agent_jid, data, price, round_id in events
+        )
+
+    def _prune_round_history(self):
+        """
+        Drop per-round bookkeeping older than MAX_ROUND_HISTORY rounds.
+
+        Round ids are increasing timestamps and every dict is keyed by the
+        round in which the entry was first created, so the oldest rounds are
+        the first keys in insertion order.
+        """
+        for per_round in (
+            self.invited_round,
+            self.offers_round,
+            self.requests_round,
+            self.declined_round,
+            self.status_seen_round,
+            self.totals_round,
+            self.counts_round,
+        ):
+            while len(per_round) > MAX_ROUND_HISTORY:
+                del per_round[next(iter(per_round))]
+
+    def known_agents(self):
+        """
+        Return every registered household, producer and storage JID.
+
+        The union is rebuilt only after a new registration, as tracked by
+        known_version.
+
+        Returns:
+            frozenset[str]: The registered agent JIDs.
+        """
+        version, agents = self._known_agents_cache
+        if version != self.known_version:
+            agents = frozenset(
+                self.known_households | self.known_producers | self.known_storage
+            )
+            self._known_agents_cache = (self.known_version, agents)
+        return agents
+
+    def next_external_grid_draw(self):
+        """
+        Return the random external grid conditions for the next round.
+
+        Draws are generated with NumPy for EXT_GRID_DRAW_BATCH rounds at a
+        time and handed out one round at a time.
+
+        Returns:
+            tuple[float, float, bool]: Buy price, sell price and whether
+            the external grid accepts transactions this round.
+        """
+        if self._ext_grid_draws is None or self._ext_grid_cursor >= EXT_GRID_DRAW_BATCH:
+            rng = self.np_rng
+            self._ext_grid_draws = (
+                rng.uniform(
+                    self.external_grid_buy_price_min,
+                    self.external_grid_buy_price_max,
+                    EXT_GRID_DRAW_BATCH,
+                ).tolist(),
+                rng.uniform(
+                    self.external_grid_sell_price_min,
+                    self.external_grid_sell_price_max,
+                    EXT_GRID_DRAW_BATCH,
+                ).tolist(),
+                (
+                    rng.random(EXT_GRID_DRAW_BATCH) < self.external_grid_acceptance_prob
+                ).tolist(),
+            )
+            self._ext_grid_cursor = 0
+
+        i = self._ext_grid_cursor
+        self._ext_grid_cursor = i + 1
+        buy_prices, sell_prices, available = self._ext_grid_draws
+        return buy_prices[i], sell_prices[i], available[i]
+
+    def _note_cfp_response(self, round_id, sender):
+        """
+        Record that an agent answered the CFP of the given round.
+
+        Only agents the CFP was sent to count, so a reply from an agent that
+        was not invited (e.g. a producer that just recovered) cannot end
+        the wait early. Sets offers_complete_event once every invited
+        agent has sent an offer, a request or a decline.
+
+        Args:
+            round_id (float): Round the response belongs to.
+            sender (str): JID of the responding agent.
+        """
+        if round_id != self.round_id or sender not in self.cfp_recipients:
+            return
+
+        responded = self.cfp_responded
+        responded.add(sender)
+        if len(responded) >= len(self.cfp_recipients):
+            self.offers_complete_event.set()
+
+    def _note_registration(self):
+        """
+        Set all_registered once every expected household, producer and
+        storage unit has registered.
+        """
+        expected = self.expected_agents
+        if (
+            len(self.known_households) >= expected["households"]
+            and len(self.known_producers) >= expected["producers"]
+            and len(self.known_storage) >= expected["storage"]
+        ):
+            self.all_registered.set()
+
+    def _note_initial_report(self):
+        """
+        Set initial_reports_complete once every expected agent has sent at
+        least one status, production or battery report.
+        """
+        if self.initial_reports_complete.is_set():
+            return
+        expected = self.expected_agents
+        reported = (
+            len(self.households_state)
+            + len(self.producers_state)
+            + len(self.storage_state)
+        )
+        if reported >= (
+            expected["households"] + expected["producers"] + expected["storage"]
+        ):
+            self.initial_reports_complete.set()
+
     def _infer_agent_category(self, agent_jid):
         """
         Infer the type of an agent (consumer, prosumer, producer, storage).
@@ -285,9 +481,7 @@ class GridNodeAgent(spade.agent.Agent):
           producer_failure_probability and assigns a failure duration.
         """
         storage_full = False
-        for _, state in self.storage_state.items():
-            soc = state.get("soc_kwh", 0)
-            cap = state.get("cap_kwh", 1)
+        for soc, cap, _ in self.storage_levels.values():
             if soc >= cap * 0.99:
                 storage_full = True
                 break
@@ -296,11 +490,7 @@ class GridNodeAgent(spade.agent.Agent):
             return
 
         # Recalculate flag based on actual producer state
-        self.any_producer_failed = False
-        for _, state in self.producers_state.items():
-            if not state.get("is_operational", True):
-                self.any_producer_failed = True
-                break
+        self.any_producer_failed = bool(self.failed_producers)
 
         # If a producer is already failed, do not trigger a new failure
         if self.any_producer_failed:
@@ -309,13 +499,18 @@ class GridNodeAgent(spade.agent.Agent):
         # Try to create a new failure
         for p_jid, state in self.producers_state.items():
             if state.get("is_operational", True):
-                if random.random() < self.producer_failure_probability:
+                if self.rng.random() < self.producer_failure_probability:
                     min_rounds, max_rounds = self.config["PRODUCERS"]["FAILURE_ROUNDS_RANGE"]
-                    failure_duration = random.randint(min_rounds, max_rounds)
+                    failure_duration = self.rng.randint(min_rounds, max_rounds)
                     state["is_operational"] = False
                     state["failure_rounds_remaining"] = failure_duration
                     state["failure_rounds_total"] = failure_duration
                     state["prod_kwh"] = 0.0
+                    self.producer_arrays.update(p_jid, state)
+                    self.market_totals.update(p_jid, *producer_contribution(state))
+                    self.failed_producers.add(p_jid)
+                    # Write out pending round log first so the alert lands in order
+                    flush_log()
                     print(
                         f"\n⚠️ SYSTEM ALERT: {p_jid} failed (offline for {failure_duration} rounds)."
                     )
@@ -4,6 +4,7 @@ import random
 import spade
 from spade.behaviour import CyclicBehaviour, OneShotBehaviour
 from spade.message import Message
+from agents.messaging import unpack_body
 from logs.db_logger import DBLogger
 from scenarios.base_config import SCENARIO_CONFIG
 
@@ -202,7 +203,7 @@ class HouseholdAgent(spade.agent.Agent):
 
             # Environment updated
             if msg_type == "environment_update":
-                data = json.loads(msg.body)
+                data = unpack_body(msg)
                 self.agent.solar_irradiance = data.get("solar_irradiance", 0)
                 self.agent.wind_speed = data.get("wind_speed", 0)
                 self.agent.temperature = data.get("temperature_c", 20)
@@ -229,7 +230,7 @@ class HouseholdAgent(spade.agent.Agent):
 
             # CFP received → prepare to bid
             elif msg_type == "call_for_offers":
-                data = json.loads(msg.body)
+                data = unpack_body(msg)
                 self.agent.active_round_id = data.get("round_id")
                 self.agent.round_deadline_ts = data.get("deadline_ts", 0)
                 self.agent.add_behaviour(self.agent.QuickBid())
@@ -0,0 +1,218 @@
+import asyncio
+import base64
+import json
+import math
+import struct
+from spade.message import Message
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+CONTENT_TYPE_JSON = "application/json"
+CONTENT_TYPE_MSGPACK = "application/msgpack"
+CONTENT_TYPE_ENV_V2 = "application/x-env-v2"
+
+# solar_irradiance, wind_speed, temperature_c (float64, so the values match
+# the JSON path exactly) + sim_hour (uint8)
+_ENV_STRUCT = struct.Struct("<dddB")
+
+DEFAULT_BATCH_SIZE = 64
+
+
+def _has_non_finite(data):
+    """
+    Tell whether a payload contains a NaN or infinite float.
+
+    Args:
+        data: Payload (dicts, lists and tuples are searched recursively).
+
+    Returns:
+        bool: True if any float in the payload is not finite.
+    """
+    if isinstance(data, float):
+        return not math.isfinite(data)
+    if isinstance(data, dict):
+        return any(_has_non_finite(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(_has_non_finite(value) for value in data)
+    return False
+
+
+def dumps(data):
+    """
+    Encode a payload as a JSON string, using orjson when available.
+
+    orjson would write NaN and Infinity as null, so payloads holding such
+    values are encoded with the stdlib encoder, which writes them out as
+    NaN/Infinity as before. Values orjson cannot encode also fall back to
+    the stdlib encoder instead of failing the send.
+
+    Args:
+        data (dict): Payload to encode.
+
+    Returns:
+        str: JSON text suitable for a SPADE message body.
+    """
+    if orjson is not None and not _has_non_finite(data):
+        try:
+            return orjson.dumps(data).decode("utf-8")
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(data, separators=(",", ":"))
+
+
+def loads(body):
+    """
+    Decode a JSON message body, using orjson when available.
+
+    Bodies orjson cannot read (e.g. NaN written by the stdlib encoder) are
+    decoded with the stdlib parser instead.
+
+    Args:
+        body (str): JSON text.
+
+    Returns:
+        dict: The decoded payload.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(body)
+
+
+def pack_body(data):
+    """
+    Serialize a message payload for inter-agent broadcasts.
+
+    MessagePack is used when available; the binary output is base64-encoded
+    because XMPP message bodies must be text. Falls back to JSON otherwise.
+
+    Args:
+        data (dict): Payload to serialize.
+
+    Returns:
+        tuple[str, str]: The encoded body and its content type, to be stored
+        in the message metadata under "content-type".
+    """
+    if msgpack is not None:
+        packed = msgpack.packb(data, use_bin_type=True)
+        return base64.b64encode(packed).decode("ascii"), CONTENT_TYPE_MSGPACK
+    return dumps(data), CONTENT_TYPE_JSON
+
+
+def pack_environment(solar_irradiance, wind_speed, temperature_c, sim_hour):
+    """
+    Encode an environment update into the fixed 25-byte binary layout.
+
+    Args:
+        solar_irradiance (float): Solar irradiance (0.0–1.0).
+        wind_speed (float): Wind speed.
+        temperature_c (float): Temperature in Celsius.
+        sim_hour (int): Simulated hour of the day (0–23).
+
+    Returns:
+        tuple[str, str]: The base64-encoded body and its content type.
+    """
+    packed = _ENV_STRUCT.pack(solar_irradiance, wind_speed, temperature_c, sim_hour)
+    return base64.b64encode(packed).decode("ascii"), CONTENT_TYPE_ENV_V2
+
+
+def unpack_body(msg):
+    """
+    Decode the body of a received message according to its content type.
+
+    Messages without a "content-type" metadata entry are treated as JSON,
+    which keeps agents that have not migrated yet fully compatible.
+
+    Args:
+        msg (spade.message.Message): Received message.
+
+    Returns:
+        dict: The decoded payload.
+    """
+    content_type = msg.metadata.get("content-type", CONTENT_TYPE_JSON)
+    if content_type == CONTENT_TYPE_ENV_V2:
+        solar, wind, temp, sim_hour = _ENV_STRUCT.unpack(base64.b64decode(msg.body))
+        return {
+            "solar_irradiance": solar,
+            "wind_speed": wind,
+            "temperature_c": temp,
+            "sim_hour": sim_hour,
+        }
+    if content_type == CONTENT_TYPE_MSGPACK:
+        if msgpack is None:
+            raise ValueError("Received a MessagePack body but msgpack is not installed")
+        return msgpack.unpackb(base64.b64decode(msg.body), raw=False)
+    return loads(msg.body)
+
+
+class BatchSender:
+    """
+    Helper that fans out one payload to many recipients from a behaviour.
+
+    Messages are dispatched concurrently with at most ``batch_size`` sends in
+    flight, so the XMPP stream is kept busy without scheduling an unbounded
+    number of sends at once.
+
+    Args:
+        behaviour (spade.behaviour.CyclicBehaviour): Behaviour used to send.
+        batch_size (int): Maximum number of concurrent sends.
+    """
+
+    def __init__(self, behaviour, batch_size=DEFAULT_BATCH_SIZE):
+        self.behaviour = behaviour
+        self.batch_size = max(1, int(batch_size))
+
+    async def send(self, jids, body, metadata):
+        """
+        Send the same body and metadata to every JID in ``jids``.
+
+        A new Message is built for every recipient on every call; only the
+        body string and the metadata dict are shared. SPADE stores the
+        metadata dict as-is, so it must not be mutated afterwards.
+
+        Args:
+            jids (Iterable[str]): Recipients.
+            body (str): Pre-encoded message body.
+            metadata (dict): Message metadata (performative, type, ...).
+        """
+        messages = []
+        for jid in jids:
+            msg = Message(to=jid)
+            msg.metadata = metadata
+            msg.body = body
+            messages.append(msg)
+        await self.send_messages(messages)
+
+    async def send_messages(self, messages):
+        """
+        Send already built messages concurrently.
+
+        Large lists go through a semaphore instead of fixed batches, so a
+        slow send only holds up its own slot rather than the whole batch.
+
+        Args:
+            messages (list[spade.message.Message]): Messages to send.
+        """
+        send = self.behaviour.send
+        if len(messages) <= self.batch_size:
+            await asyncio.gather(*(send(m) for m in messages))
+            return
+
+        limit = asyncio.Semaphore(self.batch_size)
+
+        async def send_bounded(msg):
+            async with limit:
+                await send(msg)
+
+        await asyncio.gather(*(send_bounded(m) for m in messages))
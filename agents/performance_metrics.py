@@ -41,6 +41,8 @@ class PerformanceTracker:
         producer_failures (int): Number of rounds where producers failed.
         emergency_activations (int): Number of emergency mode activations.
         report_interval (int): Number of rounds between summary reports.
+        sample_every (int): Record full round details every N rounds;
+            cumulative totals are updated every round regardless.
     """
 
     def __init__(self, config=SCENARIO_CONFIG):
@@ -78,6 +80,79 @@ class PerformanceTracker:
         # Configurable reporting interval
         self.report_interval = config["METRICS"]["REPORT_INTERVAL_ROUNDS"]
 
+        # Full per-round records are kept every N rounds (1 = every round)
+        self.sample_every = max(1, int(config["METRICS"].get("SAMPLE_EVERY_ROUNDS", 1)))
+
+    def wants_round(self, round_num):
+        """
+        Tell whether the full details of a round should be recorded.
+
+        Report rounds are always wanted so the periodic summary is printed.
+
+        Args:
+            round_num (int): The current round index (starting at 1).
+
+        Returns:
+            bool: True if the caller should build round_data and call
+            record_round, False if record_totals is enough.
+        """
+        return (
+            round_num % self.sample_every == 0
+            or (self.report_interval > 0 and round_num % self.report_interval == 0)
+        )
+
+    def record_totals(
+        self,
+        total_demand,
+        total_supplied,
+        market_value,
+        ext_grid_sold,
+        ext_grid_bought,
+        ext_grid_sold_value,
+        ext_grid_bought_value,
+        blackout,
+        any_producer_failed,
+        emergency_used,
+    ):
+        """
+        Update the cumulative counters without storing a round record.
+
+        Used directly for rounds that are not sampled, and by record_round.
+
+        Args:
+            total_demand (float): Energy demanded this round.
+            total_supplied (float): Energy supplied this round.
+            market_value (float): Internal market value this round.
+            ext_grid_sold (float): kWh imported from the external grid.
+            ext_grid_bought (float): kWh exported to the external grid.
+            ext_grid_sold_value (float): Value of the external grid exports.
+            ext_grid_bought_value (float): Value of the external grid imports.
+            blackout (bool): Whether the round had a blackout.
+            any_producer_failed (bool): Whether a producer was offline.
+            emergency_used (bool): Whether emergency storage was used.
+        """
+        self.total_demand_kwh += total_demand
+        self.total_supplied_kwh += total_supplied
+        self.total_market_value += market_value
+
+        self.ext_grid_supplied_kwh += ext_grid_sold
+        self.ext_grid_bought_kwh += ext_grid_bought
+
+        self.ext_grid_sold_value += ext_grid_sold_value
+        self.ext_grid_bought_value += ext_grid_bought_value
+
+        if blackout:
+            self.rounds_blackout += 1
+        else:
+            self.rounds_normal += 1
+
+        # Failures and emergencies
+        if any_producer_failed:
+            self.producer_failures += 1
+
+        if emergency_used:
+            self.emergency_activations += 1
+
     def record_round(self, round_num, round_data):
         """
         Records the performance metrics of a simulation round.
@@ -100,22 +175,12 @@ class PerformanceTracker:
         round_data["round"] = round_num
         self.rounds_data.append(round_data)
 
-        # Update cumulative metrics
-        self.total_demand_kwh += round_data.get("total_demand", 0)
-        self.total_supplied_kwh += round_data.get("total_supplied", 0)
-        self.total_market_value += round_data.get("market_value", 0)
-
-        self.ext_grid_supplied_kwh += round_data.get("ext_grid_sold", 0)
-        self.ext_grid_bought_kwh += round_data.get("ext_grid_bought", 0)
-
-        self.ext_grid_sold_value += round_data.get("ext_grid_sold_value", 0)
-        self.ext_grid_bought_value += round_data.get("ext_grid_bought_value", 0)
-
         # Buyer fulfillment tracking
         buyer_fulfillment = round_data.get("buyer_fulfillment", {})
-        houses_without_power = sum(
-            1 for pct in buyer_fulfillment.values() if pct < 100
-        )
+        houses_without_power = 0
+        for pct in buyer_fulfillment.values():
+            if pct < 100:
+                houses_without_power += 1
         round_data["houses_without_power"] = houses_without_power
 
         # Count houses without power (fulfillment < 100%)
@@ -136,17 +201,19 @@ class PerformanceTracker:
             blackout = avg_fulfillment < 99.0
             round_data["blackout"] = blackout
 
-        if blackout:
-            self.rounds_blackout += 1
-        else:
-            self.rounds_normal += 1
-
-        # Failures and emergencies
-        if round_data.get("any_producer_failed", False):
-            self.producer_failures += 1
-
-        if round_data.get("emergency_used", False):
-            self.emergency_activations += 1
+        # Update cumulative metrics
+        self.record_totals(
+            round_data.get("total_demand", 0),
+            round_data.get("total_supplied", 0),
+            round_data.get("market_value", 0),
+            round_data.get("ext_grid_sold", 0),
+            round_data.get("ext_grid_bought", 0),
+            round_data.get("ext_grid_sold_value", 0),
+            round_data.get("ext_grid_bought_value", 0),
+            blackout,
+            round_data.get("any_producer_failed", False),
+            round_data.get("emergency_used", False),
+        )
 
         # Print periodic report
         if (
@@ -167,7 +234,15 @@ class PerformanceTracker:
             round_num (int): Current simulation round.
         """
         start_idx = max(0, round_num - self.report_interval)
-        recent_data = self.rounds_data[start_idx:round_num]
+
+        # Records are appended in round order, possibly sampled
+        recent_data = []
+        for r in reversed(self.rounds_data):
+            if r["round"] <= start_idx:
+                break
+            if r["round"] <= round_num:
+                recent_data.append(r)
+        recent_data.reverse()
 
         if not recent_data:
             return
@@ -4,6 +4,7 @@ import random
 import spade
 from spade.behaviour import CyclicBehaviour, OneShotBehaviour
 from spade.message import Message
+from agents.messaging import unpack_body
 from logs.db_logger import DBLogger
 from scenarios.base_config import SCENARIO_CONFIG
 
@@ -199,7 +200,7 @@ class ProducerAgent(spade.agent.Agent):
 
             # ENVIRONMENT UPDATE
             if msg_type == "environment_update":
-                data = json.loads(msg.body)
+                data = unpack_body(msg)
                 self.agent.solar_irradiance = data.get("solar_irradiance", 0)
                 self.agent.wind_speed = data.get("wind_speed", 0)
                 self.agent.temperature = data.get("temperature_c", 20)
@@ -245,7 +246,7 @@ class ProducerAgent(spade.agent.Agent):
 
             # MARKET CFP
             elif msg_type == "call_for_offers":
-                data = json.loads(msg.body)
+                data = unpack_body(msg)
                 self.agent.active_round_id = data.get("round_id")
                 self.agent.round_deadline_ts = data.get("deadline_ts", 0)
                 self.agent.add_behaviour(self.agent.OfferBehaviour())
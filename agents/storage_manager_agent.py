@@ -5,6 +5,7 @@ import spade
 import asyncio
 from spade.behaviour import PeriodicBehaviour, OneShotBehaviour, CyclicBehaviour
 from spade.message import Message
+from agents.messaging import unpack_body
 from logs.db_logger import DBLogger
 from scenarios.base_config import SCENARIO_CONFIG
 
@@ -173,7 +174,7 @@ class StorageManagerAgent(spade.agent.Agent):
 
             # CFP (Call for Offers)
             if msg_type == "call_for_offers":
-                data = json.loads(msg.body)
+                data = unpack_body(msg)
 
                 self.agent.active_round_id = data.get("round_id")
                 self.agent.round_deadline_ts = data.get("deadline_ts", 0)
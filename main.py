@@ -18,6 +18,11 @@ import os
 import importlib
 from copy import deepcopy
 
+try:
+    import uvloop
+except ImportError:  # pragma: no cover - optional dependency
+    uvloop = None
+
 # Load base config object
 from scenarios.base_config import clone_config
 
@@ -322,6 +327,7 @@ async def main(config):
 
             await agent.stop()
 
+        grid_node_agent.prof.print_report()
         print("✔ Simulation finished.")
 
 
@@ -332,5 +338,9 @@ if __name__ == "__main__":
     # Optional parameter override
     config = ask_simulation_overrides(scenario_config)
 
+    # Use libuv's event loop when available (must happen before SPADE creates it)
+    if uvloop is not None and config["SIMULATION"].get("USE_UVLOOP", True):
+        uvloop.install()
+
     # Launch main coroutine using SPADE's event loop
     spade.run(main(config))
@@ -11,6 +11,10 @@ SE_SCENARIO_CONFIG = {
         "ROUND_SLEEP_SECONDS": 10,
         "OFFERS_TIMEOUT": 10,
         "TRANSMISSION_LIMIT_KW": 35.00,
+        "VERBOSE": True,  # Print the per-round auction log
+        "VERBOSE_STATUS": True,  # Print status/totals tables (False = only on a terminal)
+        "SEED": None,  # Seed for the grid node's random draws (None = unseeded)
+        "USE_UVLOOP": True,  # Run on uvloop's event loop when it is installed
         "AGENT_LIMITS_KW": {
             "prosumer": 5.00,
             "consumer": 3.00,
@@ -69,6 +73,8 @@ SE_SCENARIO_CONFIG = {
 
     "METRICS": {
         "REPORT_INTERVAL_ROUNDS": 5,
+        "SAMPLE_EVERY_ROUNDS": 1,  # Keep full round records every N rounds
+        "PROFILE": False,  # Time GridNode message handlers and printouts
     }
 }
 
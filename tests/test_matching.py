@@ -0,0 +1,101 @@
+import numpy as np
+
+from agents.grid_node.matching import match_offers
+
+
+def reference_match(offer_price, offer_remaining, buyer_cap, buyer_price_max, tx_limit):
+    """
+    Pure-Python greedy matching loop that match_offers replaced.
+
+    Returns the purchases as (buyer, offer, amount, raw_allocation) tuples,
+    the per-buyer affordable flags and the final remaining kWh per offer.
+    """
+    remaining = list(offer_remaining)
+    purchases = []
+    affordable = []
+
+    for b, (cap, price_max) in enumerate(zip(buyer_cap, buyer_price_max)):
+        available = [
+            s
+            for s, price in enumerate(offer_price)
+            if price <= price_max and remaining[s] > 0.01
+        ]
+        affordable.append(bool(available))
+
+        total = 0.0
+        for s in available:
+            remaining_deliverable = max(0.0, cap - total)
+            transmission_remaining = max(0.0, tx_limit - total)
+            if remaining_deliverable <= 0 or transmission_remaining <= 0:
+                break
+
+            raw_allocation = min(remaining[s], remaining_deliverable)
+            if raw_allocation <= 0:
+                continue
+            amount = min(raw_allocation, transmission_remaining)
+            if amount <= 0:
+                break
+
+            purchases.append((b, s, amount, raw_allocation))
+            remaining[s] -= amount
+            total += amount
+
+    return purchases, affordable, remaining
+
+
+def run_both(offer_price, offer_remaining, buyer_cap, buyer_price_max, tx_limit):
+    offer_price = np.asarray(offer_price, dtype=np.float64)
+    buyer_cap = np.asarray(buyer_cap, dtype=np.float64)
+    buyer_price_max = np.broadcast_to(
+        np.asarray(buyer_price_max, dtype=np.float64), buyer_cap.shape
+    ).copy()
+
+    expected = reference_match(
+        offer_price.tolist(),
+        list(offer_remaining),
+        buyer_cap.tolist(),
+        buyer_price_max.tolist(),
+        tx_limit,
+    )
+
+    remaining = np.asarray(offer_remaining, dtype=np.float64).copy()
+    m_buyer, m_offer, m_amount, m_raw, affordable = match_offers(
+        offer_price, remaining, buyer_cap, buyer_price_max, tx_limit
+    )
+    got = (
+        list(zip(m_buyer.tolist(), m_offer.tolist(), m_amount.tolist(), m_raw.tolist())),
+        affordable.tolist(),
+        remaining.tolist(),
+    )
+    return expected, got
+
+
+def test_float_residue_purchases_do_not_overflow():
+    # cap - (t + (cap - t)) stays > 0 here, so buyers make extra tiny
+    # purchases; this used to overrun the n_buyers + n_offers buffers
+    expected, got = run_both(
+        [0.1, 0.11, 0.12, 0.13],
+        [0.63, 1.81, 0.49, 0.3],
+        [1.66, 0.65, 0.08, 0.23, 0.35],
+        1.0,
+        35.0,
+    )
+    assert got == expected
+    assert len(got[0]) > 4 + 5
+
+
+def test_matches_reference_on_random_rounds():
+    rng = np.random.default_rng(1234)
+    for _ in range(500):
+        n_offers = int(rng.integers(0, 12))
+        n_buyers = int(rng.integers(0, 12))
+        offer_price = np.sort(rng.uniform(0.05, 0.3, n_offers).round(2))
+        offer_remaining = rng.uniform(0.0, 3.0, n_offers).round(2)
+        buyer_cap = rng.uniform(0.0, 2.0, n_buyers).round(2)
+        buyer_price_max = rng.uniform(0.05, 0.3, n_buyers).round(2)
+        tx_limit = float(rng.choice([0.5, 1.0, 35.0]))
+
+        expected, got = run_both(
+            offer_price, offer_remaining, buyer_cap, buyer_price_max, tx_limit
+        )
+        assert got == expected